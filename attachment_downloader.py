@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+基金公告附件（招募说明书 PDF 等）下载模块
+在新记录保存后运行：有界并发线程池 + 按主机限速，使用 Range 请求断点续传，
+文件按 SHA-256 内容寻址存储（重复上传的相同文件只保存一份），清单文件记录 ID 与文件的对应关系
+附件文件名变化（重新上传）的记录会重新下载；续传时通过 If-Range 确认服务器上的文件没有变化
+"""
+
+import os
+import csv
+import sys
+import json
+import time
+import hashlib
+import threading
+import urllib.request
+import urllib.parse
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+
+ATTACHMENT_ROOT = os.environ.get('ATTACHMENT_ROOT', 'data/attachments')
+# 附件下载地址模板，可使用记录中的任意字段，测试时可指向本地 HTTP 服务
+ATTACHMENT_URL_TEMPLATE = os.environ.get(
+    'ATTACHMENT_URL_TEMPLATE',
+    'http://eid.csrc.gov.cn/fund/disclose/instance_show_pdf_id.do?instanceid={uploadInfoDetailId}')
+ATTACHMENT_WORKERS = int(os.environ.get('ATTACHMENT_WORKERS', '4'))
+ATTACHMENT_HOST_INTERVAL = float(os.environ.get('ATTACHMENT_HOST_INTERVAL', '1.0'))
+ATTACHMENT_RETRIES = int(os.environ.get('ATTACHMENT_RETRIES', '3'))
+ATTACHMENT_TIMEOUT = 60
+
+MANIFEST_FIELDS = ['uploadInfoDetailId', 'sha256', 'size', 'ext', 'attachFileName', 'url', 'downloaded_at']
+CHUNK_SIZE = 64 * 1024
+
+CONTENT_TYPE_EXTENSIONS = {
+    'application/pdf': '.pdf',
+    'application/msword': '.doc',
+    'application/zip': '.zip',
+    'text/plain': '.txt',
+}
+
+
+class HostRateLimiter:
+    """按主机限速：同一主机两次请求之间至少间隔 interval 秒"""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.next_allowed = {}
+
+    def wait(self, host):
+        with self.lock:
+            now = time.monotonic()
+            scheduled = max(now, self.next_allowed.get(host, now))
+            self.next_allowed[host] = scheduled + self.interval
+        if scheduled > now:
+            time.sleep(scheduled - now)
+
+
+def _file_sha256(path):
+    """计算文件的 SHA-256"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class AttachmentDownloader:
+    """附件下载器"""
+
+    def __init__(self, root=ATTACHMENT_ROOT, url_template=ATTACHMENT_URL_TEMPLATE,
+                 workers=ATTACHMENT_WORKERS, host_interval=ATTACHMENT_HOST_INTERVAL,
+                 retries=ATTACHMENT_RETRIES):
+        self.root = root
+        self.url_template = url_template
+        self.workers = max(1, workers)
+        self.retries = max(1, retries)
+        self.rate_limiter = HostRateLimiter(host_interval)
+        self.blob_dir = os.path.join(root, 'blobs')
+        self.tmp_dir = os.path.join(root, 'tmp')
+        self.manifest_path = os.path.join(root, 'manifest.csv')
+        self.manifest_lock = threading.Lock()
+        self.manifest = self.load_manifest()
+
+    def load_manifest(self):
+        """读取清单 {uploadInfoDetailId: 清单记录}"""
+        manifest = {}
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                for row in csv.DictReader(f):
+                    manifest[row['uploadInfoDetailId']] = row
+        return manifest
+
+    def _append_manifest(self, entry):
+        """追加一条清单记录（多线程安全）"""
+        with self.manifest_lock:
+            write_header = not os.path.exists(self.manifest_path)
+            with open(self.manifest_path, 'a', encoding='utf-8', newline='') as f:
+                writer = csv.DictWriter(f, fieldnames=MANIFEST_FIELDS)
+                if write_header:
+                    writer.writeheader()
+                writer.writerow(entry)
+            self.manifest[entry['uploadInfoDetailId']] = entry
+
+    def blob_path(self, sha256, ext):
+        """内容寻址的文件路径，例如 blobs/ab/abcdef....pdf"""
+        return os.path.join(self.blob_dir, sha256[:2], f"{sha256}{ext}")
+
+    def pending_records(self, records):
+        """筛选出尚未下载的记录，以及附件文件名与清单不一致（重新上传了附件）的记录"""
+        pending = []
+        seen = set()
+        for record in records:
+            id_ = str(record.get('uploadInfoDetailId') or '')
+            if not id_ or id_ in seen:
+                continue
+            entry = self.manifest.get(id_)
+            attach_file_name = record.get('attachFileName') or ''
+            if entry is None or (attach_file_name and entry.get('attachFileName') != attach_file_name):
+                seen.add(id_)
+                pending.append(record)
+        return pending
+
+    @staticmethod
+    def _read_validator(part_path, url):
+        """读取临时文件对应的缓存校验值（ETag 或 Last-Modified），地址不一致或不存在时返回 None"""
+        try:
+            with open(f"{part_path}.meta", 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return meta.get('validator') if meta.get('url') == url else None
+
+    @staticmethod
+    def _write_validator(part_path, url, response):
+        """保存响应的校验值，用于续传时的 If-Range（弱 ETag 不能用于 If-Range，改用 Last-Modified）"""
+        etag = response.headers.get('ETag') or ''
+        validator = etag if etag and not etag.startswith('W/') else response.headers.get('Last-Modified')
+        with open(f"{part_path}.meta", 'w', encoding='utf-8') as f:
+            json.dump({'url': url, 'validator': validator}, f)
+
+    @staticmethod
+    def _remove_part(part_path):
+        for path in (part_path, f"{part_path}.meta"):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def _fetch_to_part(self, url, part_path):
+        """
+        下载到临时文件，已有部分内容时使用 Range 请求续传
+        续传请求带有 If-Range，服务器上的文件已变化时返回完整的新内容；没有校验值时从头下载
+        :return: 响应的 Content-Type
+        """
+        offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+        validator = self._read_validator(part_path, url) if offset else None
+        if offset and not validator:
+            offset = 0
+
+        req = urllib.request.Request(url)
+        req.add_header('User-Agent',
+                       'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/142.0.0.0 Safari/537.36')
+        req.add_header('Referer', 'http://eid.csrc.gov.cn/fund/disclose/index.html')
+        if offset:
+            req.add_header('Range', f'bytes={offset}-')
+            req.add_header('If-Range', validator)
+
+        self.rate_limiter.wait(urllib.parse.urlsplit(url).netloc)
+        try:
+            response = urllib.request.urlopen(req, timeout=ATTACHMENT_TIMEOUT)
+        except urllib.error.HTTPError as e:
+            # 416 表示临时文件已经是完整内容
+            if e.code == 416 and offset:
+                return ''
+            raise
+
+        with response:
+            content_type = response.headers.get('Content-Type', '').split(';')[0].strip().lower()
+            if content_type == 'text/html':
+                # 返回网页通常意味着反爬虫页面或错误页面，不作为附件保存
+                raise ValueError("服务器返回了 HTML 页面而不是附件")
+
+            # 服务器不支持 Range 时返回 200 和完整内容，需要从头写入
+            mode = 'ab' if offset and response.status == 206 else 'wb'
+            if mode == 'wb':
+                self._write_validator(part_path, url, response)
+            with open(part_path, mode) as f:
+                for chunk in iter(lambda: response.read(CHUNK_SIZE), b''):
+                    f.write(chunk)
+        return content_type
+
+    def download_one(self, record):
+        """
+        下载一条记录的附件
+        :return: 清单记录，失败时返回 None
+        """
+        id_ = str(record['uploadInfoDetailId'])
+        url = self.url_template.format_map({k: ('' if v is None else v) for k, v in record.items()})
+        part_path = os.path.join(self.tmp_dir, f"{id_}.part")
+
+        content_type = ''
+        for attempt in range(1, self.retries + 1):
+            try:
+                content_type = self._fetch_to_part(url, part_path)
+                break
+            except Exception as e:
+                print(f"附件下载失败（第 {attempt}/{self.retries} 次）{id_}: {e}")
+                if attempt == self.retries:
+                    return None
+                time.sleep(min(2 ** attempt, 30))
+
+        if not os.path.exists(part_path) or os.path.getsize(part_path) == 0:
+            print(f"附件内容为空: {id_}")
+            self._remove_part(part_path)
+            return None
+
+        attach_file_name = record.get('attachFileName') or ''
+        ext = os.path.splitext(attach_file_name)[1].lower() or CONTENT_TYPE_EXTENSIONS.get(content_type, '')
+        sha256 = _file_sha256(part_path)
+        size = os.path.getsize(part_path)
+        blob_path = self.blob_path(sha256, ext)
+
+        if not os.path.exists(blob_path):
+            os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+            os.replace(part_path, blob_path)
+        # 相同内容已存在（重复上传）时只记录对应关系
+        self._remove_part(part_path)
+
+        entry = {
+            'uploadInfoDetailId': id_,
+            'sha256': sha256,
+            'size': size,
+            'ext': ext,
+            'attachFileName': attach_file_name,
+            'url': url,
+            'downloaded_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        }
+        self._append_manifest(entry)
+        return entry
+
+    def download(self, records):
+        """
+        并发下载一批记录中尚未下载的附件
+        :return: (成功的清单记录列表, 失败的 uploadInfoDetailId 列表)
+        """
+        pending = self.pending_records(records)
+        if not pending:
+            print("没有需要下载的附件")
+            return [], []
+
+        os.makedirs(self.blob_dir, exist_ok=True)
+        os.makedirs(self.tmp_dir, exist_ok=True)
+        print(f"开始下载 {len(pending)} 个附件（并发 {self.workers}）...")
+
+        downloaded = []
+        failed = []
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = {executor.submit(self.download_one, record): str(record['uploadInfoDetailId'])
+                       for record in pending}
+            for future in as_completed(futures):
+                try:
+                    entry = future.result()
+                except Exception as e:
+                    print(f"附件处理异常 {futures[future]}: {e}")
+                    entry = None
+                if entry:
+                    downloaded.append(entry)
+                else:
+                    failed.append(futures[future])
+
+        print(f"附件下载完成: 成功 {len(downloaded)} 个，失败 {len(failed)} 个")
+        return downloaded, failed
+
+
+def download_attachments(records, root=ATTACHMENT_ROOT):
+    """下载一批记录的附件，返回成功下载的清单记录列表"""
+    downloaded, _ = AttachmentDownloader(root).download(records)
+    return downloaded
+
+
+if __name__ == "__main__":
+    # 为数据文件中所有尚未下载附件的记录补齐附件
+    from fund_store import load_store_records
+    data_file = sys.argv[1] if len(sys.argv) > 1 else 'data/csrc_fund_data.csv'
+    all_records = list(load_store_records(data_file).values())
+    _, failed_ids = AttachmentDownloader().download(all_records)
+    sys.exit(1 if failed_ids else 0)
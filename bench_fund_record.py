@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+FundRecord 基准测试
+对比普通字典与 FundRecord 的单条记录内存占用，以及加载大规模历史数据文件的耗时和内存
+"""
+
+import os
+import sys
+import csv
+import time
+import random
+import argparse
+import tempfile
+import tracemalloc
+
+from fund_record import FundRecord, FUND_FIELDS
+from fund_store import read_records
+
+
+ORGAN_NAMES = ['南方', '华夏', '易方达', '嘉实', '广发', '博时', '汇添富', '富国', '工银瑞信', '招商']
+REPORT_DESPS = ['招募说明书', '基金合同', '托管协议', '产品资料概要', '基金份额发售公告']
+
+
+def synthetic_row(index):
+    """生成一条与实际数据字段一致的模拟记录（CSV 读出的值均为字符串）"""
+    fund_code = f"{random.randint(0, 999999):06d}"
+    organ_name = random.choice(ORGAN_NAMES)
+    report_desp = random.choice(REPORT_DESPS)
+    row = {
+        'uploadInfoDetailId': str(1000000 + index),
+        'fundCode': fund_code,
+        'fundShortName': f"{organ_name}全球精选混合（QDII）{index % 977}",
+        'reportName': f"{organ_name}全球精选混合型证券投资基金（QDII）{report_desp}",
+        'organName': organ_name,
+        'reportDesp': report_desp,
+        'uploadDate': f"2025-{random.randint(1, 12):02d}-{random.randint(1, 28):02d}",
+        'reportSendDate': f"2025-{random.randint(1, 12):02d}-{random.randint(1, 28):02d}",
+        'fetched_at': '2025-11-27 20:00:00',
+        'attachFileName': f"{index}.pdf",
+        'correctionsNum': random.choice(['0', '0', '0', '1']),
+        'createTime': f"2025-11-27 {random.randint(0, 23):02d}:{random.randint(0, 59):02d}:00",
+        'fundId': str(random.randint(1, 50000)),
+        'fundSign': random.choice(['1', '2']),
+        'isShowInfo': '1',
+        'operationUploadType': random.choice(['1', '2']),
+        'reportCode': 'FA010010',
+        'reportDespNew': report_desp,
+        'reportYear': '2025',
+        'tableName': random.choice(['FUND_REPORT', 'FUND_REPORT_HIS']),
+        'uploadInfoId': str(500000 + index),
+    }
+    return row
+
+
+def measure_memory(factory, rows):
+    """返回 factory 创建全部记录后平均每条记录占用的字节数"""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    records = [factory(row) for row in rows]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del records
+    return (after - before) / len(rows)
+
+
+def write_history(path, count):
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=list(FUND_FIELDS))
+        writer.writeheader()
+        for index in range(count):
+            writer.writerow(synthetic_row(index))
+
+
+def load_as_dicts(path):
+    records = {}
+    with open(path, 'r', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            records[row['uploadInfoDetailId']] = row
+    return records
+
+
+def time_load(loader, path):
+    """返回 (耗时秒数, 峰值内存 MB)，内存在第二次加载时统计，避免 tracemalloc 影响计时"""
+    start = time.perf_counter()
+    records = loader(path)
+    elapsed = time.perf_counter() - start
+    del records
+
+    tracemalloc.start()
+    records = loader(path)
+    peak = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+    tracemalloc.stop()
+    del records
+    return elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description='FundRecord 内存与加载耗时基准测试')
+    parser.add_argument('--rows', type=int, default=1000000, help='历史数据行数，默认100万')
+    parser.add_argument('--sample', type=int, default=20000, help='单条内存测试的样本数，默认2万')
+    args = parser.parse_args()
+
+    random.seed(42)
+    sample_rows = [synthetic_row(i) for i in range(args.sample)]
+    # 模拟 CSV 读出的字符串：每条记录的值都是独立的字符串对象
+    sample_rows = [{k: ''.join(list(v)) for k, v in row.items()} for row in sample_rows]
+
+    dict_bytes = measure_memory(dict, sample_rows)
+    record_bytes = measure_memory(FundRecord.from_dict, sample_rows)
+    print(f"单条记录内存: dict {dict_bytes:.0f} 字节, FundRecord {record_bytes:.0f} 字节 "
+          f"（节省 {(1 - record_bytes / dict_bytes) * 100:.1f}%）")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'history.csv')
+        print(f"生成 {args.rows} 行历史数据...")
+        write_history(path, args.rows)
+        print(f"历史数据文件大小: {os.path.getsize(path) / 1024 / 1024:.1f} MB")
+
+        for name, loader in (('csv.DictReader -> dict', load_as_dicts), ('read_records -> FundRecord', read_records)):
+            elapsed, peak = time_load(loader, path)
+            print(f"{name:<30} 加载耗时 {elapsed:.2f} 秒, 峰值内存 {peak:.0f} MB")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
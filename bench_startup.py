@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+命令行启动时间基准测试
+多次启动新的 Python 进程，统计导入 fetch_csrc_data 和执行 --help 的耗时，
+并检查导入过程中是否加载了 selenium
+"""
+
+import os
+import sys
+import time
+import statistics
+import subprocess
+import argparse
+
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+BENCHMARKS = [
+    ('import fetch_csrc_data', [sys.executable, '-c', 'import fetch_csrc_data']),
+    ('fetch_csrc_data.py --help', [sys.executable, 'fetch_csrc_data.py', '--help']),
+]
+
+
+def time_command(cmd, runs):
+    """运行命令多次，返回每次耗时（毫秒）"""
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(cmd, cwd=SCRIPT_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=False)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def selenium_loaded_on_import():
+    """检查导入 fetch_csrc_data 时是否加载了 selenium"""
+    code = "import sys, fetch_csrc_data; print('selenium' in sys.modules)"
+    result = subprocess.run([sys.executable, '-c', code], cwd=SCRIPT_DIR,
+                            capture_output=True, text=True, check=False)
+    lines = result.stdout.strip().splitlines()
+    return lines[-1] if lines else '未知'
+
+
+def main():
+    parser = argparse.ArgumentParser(description='fetch_csrc_data 启动时间基准测试')
+    parser.add_argument('--runs', type=int, default=10, help='每项测试的运行次数，默认10次')
+    parser.add_argument('--driver', action='store_true', help='同时测试 ChromeDriver 解析耗时（需要 selenium）')
+    args = parser.parse_args()
+
+    print(f"Python: {sys.version.split()[0]}  运行次数: {args.runs}")
+    print(f"{'测试项':<30}{'最小(ms)':>10}{'中位数(ms)':>12}{'最大(ms)':>10}")
+    for name, cmd in BENCHMARKS:
+        timings = time_command(cmd, args.runs)
+        print(f"{name:<30}{min(timings):>10.1f}{statistics.median(timings):>12.1f}{max(timings):>10.1f}")
+
+    print(f"导入时加载 selenium: {selenium_loaded_on_import()}")
+
+    if args.driver:
+        sys.path.insert(0, SCRIPT_DIR)
+        from browser_fetcher import resolve_chromedriver
+        for label, refresh in (('联网解析', True), ('缓存命中', False)):
+            start = time.perf_counter()
+            path, version = resolve_chromedriver(refresh=refresh)
+            print(f"ChromeDriver {label}: {(time.perf_counter() - start) * 1000:.1f} ms -> {path} ({version})")
+
+
+if __name__ == "__main__":
+    main()
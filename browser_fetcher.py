@@ -8,43 +8,256 @@ import json
 import time
 import csv
 import os
+import re
+import subprocess
 import sys
-import urllib.parse
-from datetime import datetime, timedelta
+from datetime import datetime
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
+from selenium.common.exceptions import TimeoutException, NoSuchElementException, WebDriverException
+
+from csrc_query import build_api_url
+from fund_record import FundRecord
+from resilience import get_latency_tracker, rate_limiter
+
+# ChromeDriver 解析结果的本地缓存，避免每次运行都联网查询驱动版本
+DRIVER_CACHE_FILE = os.environ.get(
+    'CHROMEDRIVER_CACHE_FILE',
+    os.path.join(os.path.expanduser('~'), '.cache', 'qdii-new-fund-notify', 'chromedriver.json'))
+DRIVER_CACHE_TTL_HOURS = float(os.environ.get('CHROMEDRIVER_CACHE_TTL_HOURS', '168'))
+
+# 精简浏览器模式：只需要会话 cookies 和一次 XHR，默认无头运行并屏蔽图片、字体、媒体和样式表
+BROWSER_HEADLESS = os.environ.get('BROWSER_HEADLESS', 'true').lower() == 'true'
+BROWSER_LEAN_MODE = os.environ.get('BROWSER_LEAN_MODE', 'true').lower() == 'true'
+BLOCKED_URL_PATTERNS = [
+    '*.png', '*.jpg', '*.jpeg', '*.gif', '*.webp', '*.svg', '*.ico', '*.bmp',
+    '*.woff', '*.woff2', '*.ttf', '*.otf', '*.eot',
+    '*.mp4', '*.webm', '*.mp3', '*.ogg', '*.wav', '*.flv', '*.swf',
+    '*.css',
+]
+
+# 页面内批量 XHR：按并发上限分批执行，全部完成后一次性回调返回结果
+BATCH_CONCURRENCY = int(os.environ.get('BROWSER_BATCH_CONCURRENCY', '4'))
+BATCH_PAGE_SIZE = 100
+BATCH_XHR_SCRIPT = """
+var urls = arguments[0];
+var limit = arguments[1];
+var callback = arguments[arguments.length - 1];
+var results = new Array(urls.length);
+var next = 0;
+
+function request(url) {
+    return new Promise(function (resolve) {
+        var xhr = new XMLHttpRequest();
+        xhr.open('GET', url, true);
+        xhr.setRequestHeader('X-Requested-With', 'XMLHttpRequest');
+        xhr.onload = function () {
+            if (xhr.status === 200) {
+                try {
+                    resolve(JSON.parse(xhr.responseText));
+                } catch (e) {
+                    resolve(xhr.responseText);
+                }
+            } else {
+                resolve({error: 'HTTP ' + xhr.status + ': ' + xhr.statusText});
+            }
+        };
+        xhr.onerror = function () {
+            resolve({error: 'Network error'});
+        };
+        xhr.send();
+    });
+}
+
+function worker() {
+    if (next >= urls.length) {
+        return Promise.resolve();
+    }
+    var index = next++;
+    return request(urls[index]).then(function (result) {
+        results[index] = result;
+        return worker();
+    });
+}
+
+var workers = [];
+for (var i = 0; i < Math.min(limit, urls.length); i++) {
+    workers.push(worker());
+}
+Promise.all(workers).then(function () {
+    callback(results);
+});
+"""
+
+
+def _read_driver_cache():
+    """读取 ChromeDriver 缓存，缓存不存在或损坏时返回 None"""
+    try:
+        with open(DRIVER_CACHE_FILE, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(cache, dict) or not cache.get('path'):
+        return None
+    return cache
+
+
+def _write_driver_cache(path, version):
+    """写入 ChromeDriver 缓存，写入失败不影响主流程"""
+    try:
+        os.makedirs(os.path.dirname(DRIVER_CACHE_FILE), exist_ok=True)
+        with open(DRIVER_CACHE_FILE, 'w', encoding='utf-8') as f:
+            json.dump({'path': path, 'version': version, 'resolved_at': time.time()}, f)
+    except OSError as e:
+        print(f"写入 ChromeDriver 缓存失败: {e}")
+
+
+def _chromedriver_version(path):
+    """读取本地 ChromeDriver 的版本号"""
+    try:
+        output = subprocess.run([path, '--version'], capture_output=True, text=True, timeout=10).stdout
+    except (OSError, subprocess.SubprocessError):
+        return None
+    match = re.search(r'(\d+(?:\.\d+)+)', output)
+    return match.group(1) if match else None
+
+
+def resolve_chromedriver(refresh=False):
+    """
+    解析 ChromeDriver 路径和版本
+    优先使用未过期的本地缓存；缓存过期时通过 ChromeDriverManager 联网解析，
+    联网失败（离线）时回退到过期缓存；都不可用时返回 (None, None)，交给 Selenium Manager 处理
+    :param refresh: 为 True 时忽略缓存强制重新解析
+    :return: (driver_path, version)
+    """
+    cache = _read_driver_cache()
+    cached_path = cache['path'] if cache and os.path.exists(cache['path']) else None
+
+    if cached_path and not refresh:
+        age_hours = (time.time() - cache.get('resolved_at', 0)) / 3600
+        if age_hours < DRIVER_CACHE_TTL_HOURS:
+            print(f"使用缓存的 ChromeDriver: {cached_path} (版本 {cache.get('version') or '未知'})")
+            return cached_path, cache.get('version')
+
+    try:
+        from webdriver_manager.chrome import ChromeDriverManager
+        driver_path = ChromeDriverManager().install()
+        version = _chromedriver_version(driver_path)
+        _write_driver_cache(driver_path, version)
+        print(f"ChromeDriver 解析完成: {driver_path} (版本 {version or '未知'})")
+        return driver_path, version
+    except Exception as e:
+        print(f"ChromeDriverManager 解析失败: {e}")
+
+    if cached_path and not refresh:
+        print(f"离线回退到过期的 ChromeDriver 缓存: {cached_path}")
+        return cached_path, cache.get('version')
+
+    return None, None
+
+
+def _process_tree_rss_kb(root_pid):
+    """统计进程树（chromedriver 及其 Chrome 子进程）的 RSS 总和（KB），仅支持 Linux /proc"""
+    if not root_pid or not os.path.isdir('/proc'):
+        return None
+
+    page_kb = os.sysconf('SC_PAGE_SIZE') // 1024
+    children = {}
+    rss_kb = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat', 'r') as f:
+                # 进程名可能包含空格，从最后一个 ')' 之后开始解析
+                fields = f.read().rsplit(')', 1)[1].split()
+        except (OSError, IndexError):
+            continue
+        pid = int(entry)
+        children.setdefault(int(fields[1]), []).append(pid)
+        rss_kb[pid] = int(fields[21]) * page_kb
+
+    total = 0
+    stack = [root_pid]
+    while stack:
+        pid = stack.pop()
+        total += rss_kb.get(pid, 0)
+        stack.extend(children.get(pid, []))
+    return total
 
 
 class CSRCBrowserFetcher:
-    def __init__(self):
+    def __init__(self, headless=None, lean=None):
         self.driver = None
         self.wait = None
+        self.headless = BROWSER_HEADLESS if headless is None else headless
+        self.lean = BROWSER_LEAN_MODE if lean is None else lean
+        self.metrics = {}
+        self.cancelled = False
 
     def setup_browser(self):
         """设置浏览器选项"""
         chrome_options = Options()
 
         # 无头模式（在服务器上运行）
-        # chrome_options.add_argument('--headless')
+        if self.headless:
+            chrome_options.add_argument('--headless=new')
         chrome_options.add_argument('--no-sandbox')
         chrome_options.add_argument('--disable-dev-shm-usage')
         chrome_options.add_argument('--disable-gpu')
-        chrome_options.add_argument('--window-size=1920,1080')
+
+        if self.lean:
+            # 精简模式：DOMContentLoaded 后即返回，小窗口，限制渲染进程数量
+            chrome_options.page_load_strategy = 'eager'
+            chrome_options.add_argument('--window-size=800,600')
+            chrome_options.add_argument('--renderer-process-limit=2')
+            chrome_options.add_argument('--disable-extensions')
+            chrome_options.add_argument('--disable-background-networking')
+            chrome_options.add_argument('--disable-features=Translate,MediaRouter,OptimizationHints')
+            chrome_options.add_argument('--blink-settings=imagesEnabled=false')
+            chrome_options.add_argument('--mute-audio')
+            chrome_options.add_argument('--no-first-run')
+            chrome_options.add_experimental_option('prefs', {
+                'profile.managed_default_content_settings.images': 2,
+            })
+        else:
+            chrome_options.add_argument('--window-size=1920,1080')
 
         # 反检测设置
         chrome_options.add_argument('--disable-blink-features=AutomationControlled')
         chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
         chrome_options.add_experimental_option('useAutomationExtension', False)
 
-        # 安装并设置ChromeDriver
-        service = Service(ChromeDriverManager().install())
-        self.driver = webdriver.Chrome(service=service, options=chrome_options)
+        if self.cancelled:
+            raise RuntimeError("浏览器获取已取消")
+
+        # 解析ChromeDriver（优先使用本地缓存）
+        driver_path, _ = resolve_chromedriver()
+        start_time = time.perf_counter()
+        try:
+            self.driver = self._start_chrome(driver_path, chrome_options)
+        except WebDriverException as e:
+            if not driver_path:
+                raise
+            # 缓存的驱动可能与已升级的 Chrome 不匹配，强制重新解析后重试一次
+            print(f"使用缓存的 ChromeDriver 启动失败，重新解析: {e}")
+            driver_path, _ = resolve_chromedriver(refresh=True)
+            self.driver = self._start_chrome(driver_path, chrome_options)
+        self.metrics['startup_seconds'] = time.perf_counter() - start_time
+        if self.cancelled:
+            # 启动过程中被取消
+            self.driver.quit()
+            self.driver = None
+            raise RuntimeError("浏览器获取已取消")
+
+        # 通过 CDP 拦截静态资源请求
+        if self.lean:
+            self.driver.execute_cdp_cmd('Network.enable', {})
+            self.driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': BLOCKED_URL_PATTERNS})
 
         # 执行脚本隐藏WebDriver属性
         self.driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
@@ -53,27 +266,58 @@ class CSRCBrowserFetcher:
         self.wait = WebDriverWait(self.driver, 20)
 
         print("浏览器初始化完成")
-
-    def fetch_fund_data(self):
+        self.report_resources('启动后')
+
+    @staticmethod
+    def _start_chrome(driver_path, chrome_options):
+        """启动 Chrome，未解析到驱动路径时交给 Selenium Manager 自动查找"""
+        service = Service(driver_path) if driver_path else Service()
+        return webdriver.Chrome(service=service, options=chrome_options)
+
+    def report_resources(self, stage):
+        """输出浏览器启动耗时和进程树内存占用，用于对比精简模式的效果"""
+        pid = None
+        if self.driver and getattr(self.driver.service, 'process', None):
+            pid = self.driver.service.process.pid
+        rss_kb = _process_tree_rss_kb(pid)
+        if rss_kb is not None:
+            self.metrics[f'rss_mb_{stage}'] = rss_kb / 1024
+            self.metrics['peak_rss_mb'] = max(self.metrics.get('peak_rss_mb', 0), rss_kb / 1024)
+
+        startup = self.metrics.get('startup_seconds')
+        rss_text = f"{rss_kb / 1024:.1f} MB" if rss_kb is not None else "未知"
+        print(f"浏览器资源（{stage}）: 启动耗时 {startup:.2f} 秒, RSS {rss_text}, "
+              f"无头: {'是' if self.headless else '否'}, 精简模式: {'是' if self.lean else '否'}")
+
+    def open_session(self):
+        """启动浏览器并访问详情页面，建立后续 XHR 所需的会话和 cookies"""
+        # 设置浏览器
+        self.setup_browser()
+
+        # 先访问详情页面建立会话和cookies
+        detail_url = "http://eid.csrc.gov.cn/fund/disclose/index.html"
+        print(f"正在访问详情页面: {detail_url}")
+        self.driver.get(detail_url)
+        self.report_resources('页面加载后')
+
+        # 等待页面加载并取得会话cookies，等待时间根据历史耗时自适应调整
+        page_latency = get_latency_tracker('browser_page')
+        timeout = page_latency.timeout()
+        start_time = time.monotonic()
+        WebDriverWait(self.driver, timeout, poll_frequency=0.2).until(
+            lambda driver: driver.execute_script('return document.readyState') in ('interactive', 'complete')
+            and driver.get_cookies())
+        elapsed = time.monotonic() - start_time
+        page_latency.record(elapsed)
+        print(f"会话建立完成，用时 {elapsed:.1f} 秒（等待上限 {timeout:.0f} 秒）")
+
+    def fetch_fund_data(self, spec=None):
         """获取基金数据 - 通过浏览器直接发起API请求"""
         try:
-            # 设置浏览器
-            self.setup_browser()
-
-            # 先访问详情页面建立会话和cookies
-            detail_url = "http://eid.csrc.gov.cn/fund/disclose/index.html"
-            print(f"正在访问详情页面: {detail_url}")
-            self.driver.get(detail_url)
+            self.open_session()
 
-            # 等待页面加载获取必要的cookies和session信息
-            time.sleep(20)
-
-            # 计算日期范围
-            current_date = datetime.now()
-            yesterday = current_date - timedelta(days=30)
-
-            # 通过浏览器直接发起API请求获取数据
-            fund_data = self.make_direct_api_request(yesterday, current_date)
+            # 通过浏览器直接发起API请求获取数据，日期范围由 build_api_url 决定（查询条件中的日期优先，默认最近30天）
+            fund_data = self.make_direct_api_request(None, None, spec)
 
             return fund_data
 
@@ -86,42 +330,18 @@ class CSRCBrowserFetcher:
                 self.driver.quit()
                 print("浏览器已关闭")
 
-    def make_direct_api_request(self, start_date, end_date):
+    def make_direct_api_request(self, start_date, end_date, spec=None):
         """通过浏览器直接发起API请求"""
         try:
             print("正在通过浏览器发起API请求...")
 
-            # 构建API参数
-            ao_data = [
-                {"name": "sEcho", "value": 2},
-                {"name": "iColumns", "value": 6},
-                {"name": "sColumns", "value": ",,,,,,"},
-                {"name": "iDisplayStart", "value": 0},
-                {"name": "iDisplayLength", "value": 100},  # 增加返回数量
-                {"name": "mDataProp_0", "value": "fundCode"},
-                {"name": "mDataProp_1", "value": "fundId"},
-                {"name": "mDataProp_2", "value": "reportName"},
-                {"name": "mDataProp_3", "value": "organName"},
-                {"name": "mDataProp_4", "value": "reportDesp"},
-                {"name": "mDataProp_5", "value": "reportSendDate"},
-                {"name": "fundType", "value": "6020-6050"},  # QDII基金
-                {"name": "reportType", "value": "FA010010"},
-                {"name": "reportYear", "value": ""},
-                {"name": "fundCompanyShortName", "value": ""},
-                {"name": "fundCode", "value": ""},
-                {"name": "fundShortName", "value": ""},
-                {"name": "startUploadDate", "value": start_date.strftime('%Y-%m-%d')},
-                {"name": "endUploadDate", "value": end_date.strftime('%Y-%m-%d')}
-            ]
-
-            # 构建API URL
-            base_url = "http://eid.csrc.gov.cn/fund/disclose/advanced_search_report.do"
-            ao_data_str = urllib.parse.quote(json.dumps(ao_data))
-            timestamp_ms_str = str(int(time.time() * 1000))
-            api_url = f"{base_url}?aoData={ao_data_str}&_={timestamp_ms_str}"
-
-            # 设置更长的脚本超时时间（60秒）
-            self.driver.set_script_timeout(60)
+            # 构建API URL（增加返回数量）
+            api_url = build_api_url(spec, start_date, end_date, display_length=100)
+
+            # 脚本超时根据历史耗时自适应调整，并遵守全局限速
+            xhr_latency = get_latency_tracker('browser_xhr')
+            self.driver.set_script_timeout(xhr_latency.timeout())
+            rate_limiter.acquire()
 
             # 使用浏览器执行JavaScript发起GET请求
             # 注意：使用execute_async_script来处理异步操作
@@ -157,7 +377,9 @@ class CSRCBrowserFetcher:
             print(f"正在请求API: {api_url}")
 
             # 在浏览器中执行异步JavaScript代码
+            start_time = time.monotonic()
             result = self.driver.execute_async_script(js_code)
+            xhr_latency.record(time.monotonic() - start_time)
 
             # 处理返回结果
             if result:
@@ -179,8 +401,113 @@ class CSRCBrowserFetcher:
             print(f"API请求失败: {e}")
             return []
 
-    def process_api_response(self, response):
-        """处理API响应数据"""
+    def _execute_batch(self, urls, concurrency):
+        """在页面内并发执行多个 XHR，返回与 urls 顺序一致的原始响应列表"""
+        if not urls:
+            return []
+
+        # 每一轮并发请求按单次 XHR 的自适应超时预留时间
+        xhr_latency = get_latency_tracker('browser_xhr')
+        rounds = -(-len(urls) // max(1, concurrency))
+        self.driver.set_script_timeout(xhr_latency.timeout() * rounds)
+
+        # 页面内的并发请求同样计入全局限速
+        rate_limiter.acquire(len(urls))
+
+        start_time = time.monotonic()
+        results = self.driver.execute_async_script(BATCH_XHR_SCRIPT, urls, max(1, concurrency))
+        xhr_latency.record((time.monotonic() - start_time) / rounds)
+        return results or [None] * len(urls)
+
+    def fetch_batch(self, queries, concurrency=BATCH_CONCURRENCY, start_date=None, end_date=None):
+        """
+        批量获取数据：在同一个页面中通过 Promise.all 并发发起多个 XHR，只需一次 WebDriver 往返
+        需要先调用 open_session() 建立会话
+        :param queries: 查询列表，每项可以是查询条件字典（可包含 display_start/display_length），
+                        也可以是整数分页偏移量（使用默认查询条件）
+        :param concurrency: 页面内同时进行的请求数上限
+        :param start_date: 上传开始日期，默认为30天前
+        :param end_date: 上传结束日期，默认为今天
+        :return: 与 queries 顺序一致的列表，每项为处理后的基金数据列表（请求失败时为 None）
+        """
+        urls = []
+        for query in queries:
+            if isinstance(query, int):
+                spec, display_start, display_length = None, query, BATCH_PAGE_SIZE
+            else:
+                spec = query
+                display_start = query.get('display_start', 0)
+                display_length = query.get('display_length', BATCH_PAGE_SIZE)
+            urls.append(build_api_url(spec, start_date, end_date, display_start, display_length))
+
+        print(f"正在通过浏览器批量发起 {len(urls)} 个API请求（并发 {concurrency}）...")
+        try:
+            raw_results = self._execute_batch(urls, concurrency)
+        except TimeoutException:
+            print("批量API请求超时，请检查网络连接或降低并发数")
+            return [None for _ in urls]
+
+        fund_data_list = []
+        for query, url, result in zip(queries, urls, raw_results):
+            if not result:
+                print(f"API请求返回空结果: {url}")
+                fund_data_list.append(None)
+            elif isinstance(result, dict) and 'error' in result:
+                print(f"API请求错误: {result['error']} ({url})")
+                fund_data_list.append(None)
+            elif self._parse_page(result) is None:
+                print(f"API响应不是有效的JSON数据（可能是反爬虫页面）: {str(result)[:200]} ({url})")
+                fund_data_list.append(None)
+            else:
+                display_start = query if isinstance(query, int) else query.get('display_start', 0)
+                fund_data_list.append(self.process_api_response(result, display_start))
+        return fund_data_list
+
+    @staticmethod
+    def _parse_page(result):
+        """解析一页响应，不是带有 aaData 列表的 JSON（例如返回 200 的反爬虫/WAF 页面）时返回 None"""
+        if isinstance(result, str):
+            try:
+                result = json.loads(result)
+            except json.JSONDecodeError:
+                return None
+        if isinstance(result, dict) and isinstance(result.get('aaData'), list):
+            return result
+        return None
+
+    def fetch_all_pages(self, spec=None, start_date=None, end_date=None,
+                        page_size=BATCH_PAGE_SIZE, concurrency=BATCH_CONCURRENCY):
+        """
+        获取查询条件下的全部分页：先请求第一页得到总数，剩余分页一次批量取回
+        需要先调用 open_session() 建立会话
+        :return: 全部分页的基金数据列表，任意一页请求失败时返回 None（避免把不完整的结果当作成功）
+        """
+        first_url = build_api_url(spec, start_date, end_date, 0, page_size)
+        raw_first = self._execute_batch([first_url], 1)[0]
+        first = self._parse_page(raw_first)
+        if first is None:
+            error = raw_first.get('error') if isinstance(raw_first, dict) else str(raw_first)[:200]
+            print(f"首页请求失败: {error}")
+            return None
+
+        fund_data = self.process_api_response(first)
+        total = int(first.get('iTotalDisplayRecords') or first.get('iTotalRecords') or 0)
+        offsets = list(range(page_size, total, page_size))
+        if offsets:
+            queries = [dict(spec or {}, display_start=offset, display_length=page_size) for offset in offsets]
+            for offset, page in zip(offsets, self.fetch_batch(queries, concurrency, start_date, end_date)):
+                if page is None:
+                    print(f"分页请求失败（偏移量 {offset}），放弃本次结果")
+                    return None
+                fund_data.extend(page)
+        print(f"共获取 {len(fund_data)} 条数据（总数 {total}，{len(offsets) + 1} 页）")
+        return fund_data
+
+    def process_api_response(self, response, display_start=0):
+        """
+        处理API响应数据
+        :param display_start: 该页的分页偏移量，用于为缺少编号的列表行生成跨页唯一的 uploadInfoDetailId
+        """
         try:
             # 如果响应是字符串，尝试解析为JSON
             if isinstance(response, str):
@@ -199,23 +526,26 @@ class CSRCBrowserFetcher:
                 # 转换为标准格式
                 fund_data = []
                 for i, item in enumerate(data['aaData']):
-                    if isinstance(item, list) and len(item) >= 6:
-                        fund_item = {
-                            'fundCode': item[0] if len(item) > 0 else '',
-                            'fundId': item[1] if len(item) > 1 else '',
-                            'reportName': item[2] if len(item) > 2 else '',
-                            'organName': item[3] if len(item) > 3 else '',
-                            'reportDesp': item[4] if len(item) > 4 else '',
-                            'reportSendDate': item[5] if len(item) > 5 else '',
-                            'uploadInfoDetailId': f"api_{i}_{int(time.time())}",
-                            'uploadDate': datetime.now().strftime('%Y-%m-%d')
-                        }
+                    if isinstance(item, dict):
+                        # 实际接口返回的格式，与 urllib 方式的 process_fund_data 一致
+                        fund_data.append(FundRecord.from_dict(item))
+                    elif isinstance(item, list) and len(item) >= 6:
+                        fund_item = FundRecord(
+                            fundCode=item[0] if len(item) > 0 else '',
+                            fundId=item[1] if len(item) > 1 else '',
+                            reportName=item[2] if len(item) > 2 else '',
+                            organName=item[3] if len(item) > 3 else '',
+                            reportDesp=item[4] if len(item) > 4 else '',
+                            reportSendDate=item[5] if len(item) > 5 else '',
+                            uploadInfoDetailId=f"api_{display_start + i}_{int(time.time())}",
+                            uploadDate=datetime.now().strftime('%Y-%m-%d')
+                        )
                         fund_data.append(fund_item)
 
                 return fund_data
             elif isinstance(data, list):
                 print(f"获取到 {len(data)} 条数据")
-                return data
+                return [FundRecord.from_dict(item) if isinstance(item, dict) else item for item in data]
             else:
                 print(f"未识别的数据格式: {type(data)}")
                 return []
@@ -229,11 +559,35 @@ class CSRCBrowserFetcher:
         if self.driver:
             self.driver.quit()
 
+    def cancel(self):
+        """取消正在进行的获取（可在其他线程调用），关闭浏览器使进行中的 WebDriver 调用立即失败"""
+        self.cancelled = True
+        driver, self.driver = self.driver, None
+        if driver:
+            try:
+                driver.quit()
+                print("浏览器获取已取消")
+            except Exception as e:
+                print(f"关闭浏览器失败: {e}")
+
 
-def fetch_csrc_data_browser():
+def fetch_csrc_data_browser(spec=None):
     """使用浏览器获取CSRC数据的主函数"""
     fetcher = CSRCBrowserFetcher()
-    return fetcher.fetch_fund_data()
+    return fetcher.fetch_fund_data(spec)
+
+
+def fetch_csrc_data_browser_batch(queries, concurrency=BATCH_CONCURRENCY):
+    """使用一个浏览器标签页批量获取多个查询条件或分页的数据"""
+    fetcher = CSRCBrowserFetcher()
+    try:
+        fetcher.open_session()
+        return fetcher.fetch_batch(queries, concurrency)
+    except Exception as e:
+        print(f"批量获取数据失败: {e}")
+        return None
+    finally:
+        fetcher.close()
 
 
 if __name__ == "__main__":
@@ -244,7 +598,8 @@ if __name__ == "__main__":
         print(f"获取成功，共 {len(data)} 条数据")
         # 保存为JSON文件用于测试
         with open('browser_fund_data.json', 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+            json.dump([item.to_dict() if isinstance(item, FundRecord) else item for item in data],
+                      f, ensure_ascii=False, indent=2)
         print("数据已保存到 browser_fund_data.json")
     else:
         print("获取数据失败")
\ No newline at end of file
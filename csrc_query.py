@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+资本市场电子化信息披露平台高级检索接口的查询参数构建
+urllib 和浏览器自动化两种获取方式共用
+"""
+
+import json
+import time
+import urllib.parse
+from datetime import datetime, timedelta
+
+
+BASE_URL = "http://eid.csrc.gov.cn/fund/disclose/advanced_search_report.do"
+
+# 默认查询条件：最近30天上传的 QDII 基金招募说明书
+DEFAULT_QUERY_SPEC = {
+    'fundType': '6020-6050',  # QDII基金
+    'reportType': 'FA010010',
+    'reportYear': '',
+    'fundCompanyShortName': '',
+    'fundCode': '',
+    'fundShortName': '',
+}
+
+DEFAULT_LOOKBACK_DAYS = 30
+
+
+def _format_date(value):
+    """日期参数支持 datetime 或 'YYYY-MM-DD' 字符串"""
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d')
+    return value
+
+
+def build_ao_data(spec=None, start_date=None, end_date=None, display_start=0, display_length=20):
+    """
+    构建 aoData 参数列表
+    :param spec: 查询条件字典，未指定的字段使用 DEFAULT_QUERY_SPEC
+    :param start_date: 上传开始日期，默认为30天前
+    :param end_date: 上传结束日期，默认为今天
+    :param display_start: 分页偏移量
+    :param display_length: 每页数量
+    """
+    query = dict(DEFAULT_QUERY_SPEC)
+    if spec:
+        query.update({k: v for k, v in spec.items() if k in DEFAULT_QUERY_SPEC})
+
+    now = datetime.now()
+    start_date = start_date or (spec or {}).get('startUploadDate') or now - timedelta(days=DEFAULT_LOOKBACK_DAYS)
+    end_date = end_date or (spec or {}).get('endUploadDate') or now
+
+    ao_data = [
+        {"name": "sEcho", "value": 2},
+        {"name": "iColumns", "value": 6},
+        {"name": "sColumns", "value": ",,,,,,"},
+        {"name": "iDisplayStart", "value": display_start},
+        {"name": "iDisplayLength", "value": display_length},
+        {"name": "mDataProp_0", "value": "fundCode"},
+        {"name": "mDataProp_1", "value": "fundId"},
+        {"name": "mDataProp_2", "value": "reportName"},
+        {"name": "mDataProp_3", "value": "organName"},
+        {"name": "mDataProp_4", "value": "reportDesp"},
+        {"name": "mDataProp_5", "value": "reportSendDate"},
+    ]
+    ao_data.extend({"name": name, "value": value} for name, value in query.items())
+    ao_data.append({"name": "startUploadDate", "value": _format_date(start_date)})
+    ao_data.append({"name": "endUploadDate", "value": _format_date(end_date)})
+    return ao_data
+
+
+def build_api_url(spec=None, start_date=None, end_date=None, display_start=0, display_length=20):
+    """构建完整的 API 请求地址，参数含义同 build_ao_data"""
+    ao_data = build_ao_data(spec, start_date, end_date, display_start, display_length)
+    ao_data_str = urllib.parse.quote(json.dumps(ao_data))
+    timestamp_ms_str = str(int(time.time() * 1000))
+    return f"{BASE_URL}?aoData={ao_data_str}&_={timestamp_ms_str}"
+
+
+def load_query_specs(path):
+    """从 JSON 文件读取查询条件列表，文件内容为字典列表"""
+    with open(path, 'r', encoding='utf-8') as f:
+        specs = json.load(f)
+    if isinstance(specs, dict):
+        specs = [specs]
+    if not isinstance(specs, list) or not all(isinstance(spec, dict) for spec in specs):
+        raise ValueError(f"查询条件文件格式错误，应为字典列表: {path}")
+    return specs
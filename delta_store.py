@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+按日增量导出
+EXPORT_MODE=delta 时每次运行只把新增和变更的记录写入当天的增量文件 data/deltas/YYYY/MM/YYYY-MM-DD.csv，
+不再重写完整的数据文件，仓库每天只增加一个很小的文件；
+往年的增量文件定期压缩为年度快照 data/snapshots/YYYY.csv
+
+当前状态 = 原有数据文件（基线，不再改写）+ 年度快照 + 增量文件，
+按时间顺序流式读取一遍，同一 uploadInfoDetailId 后出现的记录覆盖先出现的
+
+用法:
+  python delta_store.py compact            # 把往年的增量文件压缩为年度快照
+  python delta_store.py compact --all      # 同时压缩今年的增量文件
+  python delta_store.py export out.csv     # 导出合并后的完整数据文件
+"""
+
+import os
+import csv
+import sys
+import glob
+from datetime import datetime
+
+from fund_record import row_loader
+from fund_store import store_lock, read_records, write_records
+
+
+DEFAULT_DATA_FILE = 'data/csrc_fund_data.csv'
+DELTAS_DIR = 'data/deltas'
+SNAPSHOTS_DIR = 'data/snapshots'
+
+
+def store_dirs(base_file=DEFAULT_DATA_FILE):
+    """
+    数据文件对应的增量目录和年度快照目录：默认数据文件为 data/deltas 和 data/snapshots，
+    其他数据文件为同目录的 <文件名>.deltas 和 <文件名>.snapshots，不会混入默认数据文件的增量
+    """
+    if os.path.normpath(base_file) == os.path.normpath(DEFAULT_DATA_FILE):
+        return DELTAS_DIR, SNAPSHOTS_DIR
+    base, _ = os.path.splitext(base_file)
+    return f"{base}.deltas", f"{base}.snapshots"
+
+
+def delta_path(day, root=DELTAS_DIR):
+    """某一天的增量文件路径，day 为 YYYY-MM-DD"""
+    return os.path.join(root, day[:4], day[5:7], f"{day}.csv")
+
+
+def snapshot_path(year, root=SNAPSHOTS_DIR):
+    """年度快照路径"""
+    return os.path.join(root, f"{year}.csv")
+
+
+def delta_files(root=DELTAS_DIR):
+    """按日期排序的增量文件列表 [(YYYY-MM-DD, 路径)]"""
+    paths = glob.glob(os.path.join(root, '[0-9]' * 4, '[0-9]' * 2, '*.csv'))
+    return sorted((os.path.splitext(os.path.basename(path))[0], path) for path in paths)
+
+
+def snapshot_files(root=SNAPSHOTS_DIR):
+    """按年份排序的年度快照列表 [(YYYY, 路径)]"""
+    paths = glob.glob(os.path.join(root, '[0-9]' * 4 + '.csv'))
+    return sorted((os.path.splitext(os.path.basename(path))[0], path) for path in paths)
+
+
+def state_files(base_file=DEFAULT_DATA_FILE, deltas_dir=None, snapshots_dir=None):
+    """
+    重建当前状态需要依次读取的文件：基线数据文件、年度快照、增量文件
+    同一年的快照排在该年剩余的增量文件之前（压缩今年的增量后，今年仍会产生新的增量文件）
+    未指定目录时使用 store_dirs(base_file)
+    """
+    default_deltas, default_snapshots = store_dirs(base_file)
+    deltas_dir = deltas_dir or default_deltas
+    snapshots_dir = snapshots_dir or default_snapshots
+    ordered = [((year, 0, ''), path) for year, path in snapshot_files(snapshots_dir)]
+    ordered += [((day[:4], 1, day), path) for day, path in delta_files(deltas_dir)]
+    files = [path for _, path in sorted(ordered)]
+    if os.path.exists(base_file):
+        files.insert(0, base_file)
+    return files
+
+
+def iter_records(paths):
+    """按顺序流式读取多个数据文件，逐条返回记录"""
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            reader = csv.reader(f)
+            header = next(reader, None)
+            if not header or 'uploadInfoDetailId' not in header:
+                continue
+            id_index = header.index('uploadInfoDetailId')
+            load = row_loader(header)
+            for row in reader:
+                if len(row) > id_index and row[id_index]:
+                    yield load(row)
+
+
+def load_state(base_file=DEFAULT_DATA_FILE, deltas_dir=None, snapshots_dir=None):
+    """合并基线、年度快照和增量文件，返回当前状态 {uploadInfoDetailId: 记录}"""
+    records = {}
+    for record in iter_records(state_files(base_file, deltas_dir, snapshots_dir)):
+        records[record['uploadInfoDetailId']] = record
+    return records
+
+
+def write_delta(records, day, root=DELTAS_DIR):
+    """
+    把新增和变更的记录写入当天的增量文件，同一天多次运行时与已有内容合并
+    调用方需要持有 store_lock
+    :return: 增量文件路径
+    """
+    path = delta_path(day, root)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    merged = read_records(path)
+    for record in records:
+        merged[str(record['uploadInfoDetailId'])] = record
+    write_records(path, merged)
+    return path
+
+
+def compact_deltas(include_current_year=False, deltas_dir=DELTAS_DIR, snapshots_dir=SNAPSHOTS_DIR):
+    """
+    把增量文件按年压缩到年度快照（与已有快照合并），然后删除已压缩的增量文件
+    调用方需要持有 store_lock；删除前快照已原子写入，中途中断时重复读取增量文件也不会改变结果
+    :return: 已压缩的年份列表
+    """
+    current_year = datetime.now().strftime('%Y')
+    by_year = {}
+    for day, path in delta_files(deltas_dir):
+        if include_current_year or day[:4] < current_year:
+            by_year.setdefault(day[:4], []).append(path)
+
+    for year, paths in sorted(by_year.items()):
+        snapshot = snapshot_path(year, snapshots_dir)
+        os.makedirs(snapshots_dir, exist_ok=True)
+        records = read_records(snapshot)
+        for record in iter_records(paths):
+            records[record['uploadInfoDetailId']] = record
+        write_records(snapshot, records)
+
+        for path in paths:
+            os.remove(path)
+            # 删除空的月份和年份目录
+            for directory in (os.path.dirname(path), os.path.dirname(os.path.dirname(path))):
+                if os.path.isdir(directory) and not os.listdir(directory):
+                    os.rmdir(directory)
+        print(f"已将 {year} 年的 {len(paths)} 个增量文件压缩到 {snapshot}（{len(records)} 条记录）")
+
+    return sorted(by_year)
+
+
+def main():
+    if len(sys.argv) < 2 or sys.argv[1] not in ('compact', 'export'):
+        print(__doc__)
+        sys.exit(1)
+
+    command = sys.argv[1]
+    with store_lock(DEFAULT_DATA_FILE):
+        if command == 'compact':
+            years = compact_deltas(include_current_year='--all' in sys.argv[2:])
+            if not years:
+                print("没有需要压缩的增量文件")
+        else:
+            if len(sys.argv) < 3:
+                print("❌ 错误: 请指定导出文件路径")
+                sys.exit(1)
+            total = write_records(sys.argv[2], load_state())
+            print(f"已导出 {total} 条记录到 {sys.argv[2]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -54,14 +54,36 @@ class SimpleEmailNotifier:
             self.logger.info("没有新基金数据，跳过邮件通知")
             return True
 
-        # 默认收件人为发件人自己（自发自收）
+        # 格式化邮件内容
+        subject, body_text, body_html = self._format_email_content(new_funds_data)
+        return self._send_email(subject, body_text, body_html, recipient_emails)
+
+    def send_correction_notification(self, changed_funds_data, changes, recipient_emails=None):
+        """
+        发送已有基金数据的更正/变更通知邮件
+        :param changed_funds_data: 发生变更的基金数据列表（变更后的内容）
+        :param changes: 字段级变更明细列表，每项包含 uploadInfoDetailId、field、old_value、new_value
+        :param recipient_emails: 收件人邮箱列表（默认发给自己）
+        :return: 发送成功返回True，失败返回False
+        """
+
+        if not self.is_configured():
+            self.logger.warning("邮件功能未配置，跳过邮件发送")
+            return False
+
+        if not changed_funds_data:
+            self.logger.info("没有变更的基金数据，跳过邮件通知")
+            return True
+
+        subject, body_text, body_html = self._format_correction_content(changed_funds_data, changes)
+        return self._send_email(subject, body_text, body_html, recipient_emails)
+
+    def _send_email(self, subject, body_text, body_html, recipient_emails=None):
+        """通过 SMTP 发送邮件，收件人默认为发件人自己（自发自收）"""
         if not recipient_emails:
             recipient_emails = [self.sender_email]
 
         try:
-            # 格式化邮件内容
-            subject, body_text, body_html = self._format_email_content(new_funds_data)
-
             # 创建邮件
             msg = MIMEMultipart('alternative')
             msg['From'] = self.sender_email
@@ -180,6 +202,94 @@ CSV文件路径：data/csrc_fund_data.csv
     </div>
 </body>
 </html>
+"""
+
+        return subject, body_text, body_html
+
+    def _format_correction_content(self, changed_funds_data, changes):
+        """格式化更正通知邮件内容"""
+
+        current_date = datetime.now().strftime('%Y-%m-%d')
+        subject = f"[QDII基金更正] {current_date} - {len(changed_funds_data)} 条基金数据发生变更"
+
+        changes_by_id = {}
+        for change in changes:
+            changes_by_id.setdefault(change['uploadInfoDetailId'], []).append(change)
+
+        body_text = f"""
+QDII基金数据更正通知
+
+{len(changed_funds_data)} 条已发布的基金数据发生变更：
+
+"""
+        body_html_items = ""
+
+        for i, fund in enumerate(changed_funds_data, 1):
+            fund_changes = changes_by_id.get(str(fund.get('uploadInfoDetailId')), [])
+            body_text += f"""
+{i}. 基金代码：{fund.get('fundCode', 'N/A')}
+   基金名称：{fund.get('fundShortName', 'N/A')}
+   报告名称：{fund.get('reportName', 'N/A')}
+"""
+            change_rows = ""
+            for change in fund_changes:
+                body_text += f"   {change['field']}：{change['old_value'] or '(空)'} → {change['new_value'] or '(空)'}\n"
+                change_rows += f"""
+                <tr><td>{change['field']}</td><td>{change['old_value'] or '(空)'}</td><td>{change['new_value'] or '(空)'}</td></tr>"""
+
+            body_html_items += f"""
+        <div class="fund-item">
+            <div class="fund-title">{i}. {fund.get('fundCode', 'N/A')} - {fund.get('fundShortName', 'N/A')}</div>
+            <div class="fund-info"><span class="fund-label">📄 报告名称：</span>{fund.get('reportName', 'N/A')}</div>
+            <table>
+                <tr><th>字段</th><th>原值</th><th>新值</th></tr>{change_rows}
+            </table>
+        </div>
+"""
+
+        body_text += f"""
+数据获取时间：{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
+变更明细文件：data/csrc_fund_changes.csv
+
+---
+此邮件由QDII基金监控系统自动发送
+"""
+
+        body_html = f"""
+<html>
+<head>
+    <meta charset="UTF-8">
+    <style>
+        body {{ font-family: 'Microsoft YaHei', Arial, sans-serif; line-height: 1.6; color: #333; margin: 0; padding: 20px; }}
+        .header {{ background: linear-gradient(135deg, #f6a04d 0%, #e8634a 100%); color: white; padding: 20px; text-align: center; border-radius: 10px 10px 0 0; }}
+        .content {{ background: #f8f9fa; padding: 20px; border-radius: 0 0 10px 10px; }}
+        .fund-item {{ background: white; margin: 15px 0; padding: 20px; border-radius: 8px; box-shadow: 0 2px 4px rgba(0,0,0,0.1); border-left: 4px solid #e8634a; }}
+        .fund-title {{ font-size: 18px; font-weight: bold; color: #e8634a; margin-bottom: 10px; }}
+        .fund-info {{ margin: 5px 0; }}
+        .fund-label {{ font-weight: bold; color: #555; }}
+        table {{ border-collapse: collapse; width: 100%; margin-top: 10px; }}
+        th, td {{ border: 1px solid #dee2e6; padding: 6px 10px; text-align: left; }}
+        th {{ background: #f1f3f5; }}
+        .footer {{ background: #e9ecef; padding: 15px; text-align: center; font-size: 12px; color: #666; margin-top: 20px; border-radius: 8px; }}
+    </style>
+</head>
+<body>
+    <div class="header">
+        <h2>✏️ QDII基金数据更正通知</h2>
+        <p>{len(changed_funds_data)} 条已发布的基金数据发生变更</p>
+    </div>
+
+    <div class="content">
+{body_html_items}
+    </div>
+
+    <div class="footer">
+        <p>⏰ 数据获取时间：{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}</p>
+        <p>📁 变更明细文件：data/csrc_fund_changes.csv</p>
+        <p>🤖 此邮件由QDII基金监控系统自动发送</p>
+    </div>
+</body>
+</html>
 """
 
         return subject, body_text, body_html
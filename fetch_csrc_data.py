@@ -7,12 +7,21 @@
 import os
 import json
 import time
+import importlib.util
 import urllib.request
-import urllib.parse
 from datetime import datetime, timedelta
 import sys
-import csv
 import argparse
+import multiprocessing
+import queue
+import tempfile
+import threading
+
+from csrc_query import build_api_url, load_query_specs
+from fund_record import FundRecord
+from fund_store import store_lock, commit_batch, StoreLockTimeout
+from resilience import get_policy, rate_limiter, CircuitOpenError, FetchCancelled
+from work_queue import WorkQueue, shard_specs
 
 # 尝试导入 schedule 库，如果没有则使用简单的 sleep 方式
 try:
@@ -22,54 +31,34 @@ except ImportError:
     SCHEDULE_AVAILABLE = False
     print("提示: 安装 schedule 库可获得更好的定时任务体验: pip install schedule")
 
-# 浏览器自动化模块
-try:
-    from browser_fetcher import fetch_csrc_data_browser
-    BROWSER_AVAILABLE = True
-except ImportError:
-    BROWSER_AVAILABLE = False
+# 浏览器自动化模块（延迟导入：只检查依赖是否存在，真正选择浏览器方式时才加载 selenium）
+BROWSER_AVAILABLE = all(importlib.util.find_spec(name) is not None
+                        for name in ('selenium', 'webdriver_manager'))
+if not BROWSER_AVAILABLE:
     print("浏览器自动化模块不可用，将仅使用urllib方式")
 
+# 获取方式: sequential（先浏览器后urllib，默认）或 hedged（urllib 优先，超时后用浏览器对冲）
+FETCH_MODE = os.environ.get('FETCH_MODE', 'sequential').lower()
+HEDGE_DELAY_SECONDS = float(os.environ.get('HEDGE_DELAY_SECONDS', '10'))
+# 工作进程使用 urllib 分页获取分片时每页的记录数
+URLLIB_PAGE_SIZE = 100
 
-def fetch_csrc_data():
-    """从 CSRC 网站获取基金数据"""
-
-    # API 地址和参数
-    base_url = "http://eid.csrc.gov.cn/fund/disclose/advanced_search_report.do"
-
-    current_date_str = datetime.now().strftime('%Y-%m-%d')
-    yesterday_str = (datetime.now() - timedelta(days=30)).strftime('%Y-%m-%d')
-
-    # 设置请求参数
-    ao_data = [
-        {"name": "sEcho", "value": 2},
-        {"name": "iColumns", "value": 6},
-        {"name": "sColumns", "value": ",,,,,,"},
-        {"name": "iDisplayStart", "value": 0},
-        {"name": "iDisplayLength", "value": 20},
-        {"name": "mDataProp_0", "value": "fundCode"},
-        {"name": "mDataProp_1", "value": "fundId"},
-        {"name": "mDataProp_2", "value": "reportName"},
-        {"name": "mDataProp_3", "value": "organName"},
-        {"name": "mDataProp_4", "value": "reportDesp"},
-        {"name": "mDataProp_5", "value": "reportSendDate"},
-        {"name": "fundType", "value": "6020-6050"},
-        {"name": "reportType", "value": "FA010010"},
-        {"name": "reportYear", "value": ""},
-        {"name": "fundCompanyShortName", "value": ""},
-        {"name": "fundCode", "value": ""},
-        {"name": "fundShortName", "value": ""},
-        {"name": "startUploadDate", "value": yesterday_str},
-        {"name": "endUploadDate", "value": current_date_str}
-    ]
-
-    # 将参数编码为 JSON 字符串
-    ao_data_str = urllib.parse.quote(json.dumps(ao_data))
-    timestamp_ms_str = str(int(time.time() * 1000))
-    api_url = f"{base_url}?aoData={ao_data_str}&_={timestamp_ms_str}"
 
-    try:
-        print(f"正在获取数据从: {api_url}")
+def fetch_csrc_data(spec=None, display_start=0, display_length=20, cancel=None):
+    """
+    从 CSRC 网站获取基金数据，spec 为查询条件字典（默认查询 QDII 基金），display_start/display_length 为分页参数
+    cancel 为可选的 threading.Event，设置后不再重试（对冲获取中浏览器一方已经成功时）
+    """
+
+    api_url = build_api_url(spec, display_start=display_start, display_length=display_length)
+
+    policy = get_policy('urllib')
+
+    def request_once():
+        # 全局限速，并使用根据历史耗时计算的自适应超时
+        rate_limiter.acquire()
+        timeout = policy.timeout()
+        print(f"正在获取数据从: {api_url}（超时 {timeout:.0f} 秒）")
 
         # 创建请求对象
         req = urllib.request.Request(api_url)
@@ -85,7 +74,7 @@ def fetch_csrc_data():
         req.add_header('X-Requested-With', 'XMLHttpRequest')
 
         # 发送请求并获取响应
-        with urllib.request.urlopen(req, timeout=60) as response:
+        with urllib.request.urlopen(req, timeout=timeout) as response:
             # 获取响应状态码
             status_code = response.getcode()
             print(f"HTTP 状态码: {status_code}")
@@ -113,6 +102,16 @@ def fetch_csrc_data():
                 # 如果 JSON 解析失败，返回原始内容
                 return content
 
+    try:
+        # 超时、连接错误和 429/5xx 会按抖动退避重试，连续失败后熔断
+        return policy.call(request_once, cancel)
+
+    except CircuitOpenError as e:
+        print(f"跳过 urllib 方式: {e}")
+        return None
+    except FetchCancelled:
+        print("urllib 方式已取消")
+        return None
     except urllib.error.URLError as e:
         print(f"API 请求失败: {e}")
         if hasattr(e, 'reason'):
@@ -126,6 +125,11 @@ def fetch_csrc_data():
         return None
 
 
+def to_fund_records(items):
+    """把字典形式的数据项转换为 FundRecord，其他形式的数据项保持不变"""
+    return [FundRecord.from_dict(item) if isinstance(item, dict) else item for item in items]
+
+
 def process_fund_data(data):
     """处理基金数据，转换为标准格式"""
 
@@ -143,20 +147,186 @@ def process_fund_data(data):
     if isinstance(data, dict):
         if 'aaData' in data and isinstance(data['aaData'], list):
             print(f"从 aaData 中提取数据，共 {len(data['aaData'])} 条记录")
-            return data['aaData']
+            return to_fund_records(data['aaData'])
         elif 'data' in data and isinstance(data['data'], list):
-            return data['data']
+            return to_fund_records(data['data'])
         else:
-            return [data]
+            return to_fund_records([data])
     elif isinstance(data, list):
-        return data
+        return to_fund_records(data)
     else:
         print(f"不支持的数据格式: {type(data)}")
         return []
 
 
+def is_valid_result(raw_data):
+    """判断获取结果是否有效：DataTables 格式的字典或非空列表，反爬虫页面等字符串内容视为无效"""
+    if isinstance(raw_data, dict):
+        return isinstance(raw_data.get('aaData'), list) or isinstance(raw_data.get('data'), list)
+    return isinstance(raw_data, list) and len(raw_data) > 0
+
+
+def fetch_all_pages(spec=None, page_size=URLLIB_PAGE_SIZE):
+    """
+    使用 urllib 获取查询条件下的全部分页：先请求第一页得到总数（iTotalDisplayRecords/iTotalRecords），再依次请求剩余分页
+    :return: 全部分页的基金数据列表，任意一页获取失败时返回 None（避免把不完整的结果当作成功）
+    """
+    first = fetch_csrc_data(spec, 0, page_size)
+    if not is_valid_result(first):
+        print("首页请求失败")
+        return None
+
+    fund_data = process_fund_data(first)
+    total = int(first.get('iTotalDisplayRecords') or first.get('iTotalRecords') or 0) if isinstance(first, dict) else 0
+    offsets = list(range(page_size, total, page_size))
+    for offset in offsets:
+        page = fetch_csrc_data(spec, offset, page_size)
+        if not is_valid_result(page):
+            print(f"分页请求失败（偏移量 {offset}），放弃本次结果")
+            return None
+        fund_data.extend(process_fund_data(page))
+    print(f"共获取 {len(fund_data)} 条数据（总数 {total}，{len(offsets) + 1} 页）")
+    return fund_data
+
+
+def fetch_hedged(spec=None, hedge_delay=HEDGE_DELAY_SECONDS):
+    """
+    对冲获取：立即发起 urllib 请求，超过 hedge_delay 秒仍未成功或收到无效响应（例如反爬虫页面）时
+    再启动浏览器方式，采用最先返回的有效结果并取消另一方，整体耗时取决于最快的可用方式
+    """
+    results = queue.Queue()
+    browser_fetcher = None
+    browser_started = False
+    cancelled = threading.Event()
+
+    def run(name, func):
+        try:
+            results.put((name, func()))
+        except FetchCancelled:
+            results.put((name, None))
+        except Exception as e:
+            print(f"{name} 方式出错: {e}")
+            results.put((name, None))
+
+    def start(name, func):
+        # 守护线程：失败的一方被取消后不会阻塞程序退出
+        threading.Thread(target=run, args=(name, func), name=f"hedge-{name}", daemon=True).start()
+
+    def start_browser():
+        nonlocal browser_started
+        browser_started = True
+
+        def browser_task():
+            # 在对冲线程中导入和创建浏览器获取器，selenium 安装损坏等错误只会使浏览器一方失败
+            nonlocal browser_fetcher
+            from browser_fetcher import CSRCBrowserFetcher
+            browser_fetcher = CSRCBrowserFetcher()
+            if cancelled.is_set():
+                return None
+
+            def browser_once():
+                data = browser_fetcher.fetch_fund_data(spec)
+                if browser_fetcher.cancelled:
+                    # 被取消的一方不计入耗时统计和熔断状态
+                    raise FetchCancelled("浏览器获取已取消")
+                if not data:
+                    raise RuntimeError("浏览器自动化获取失败")
+                return data
+
+            return get_policy('browser').call(browser_once, cancelled)
+
+        start('browser', browser_task)
+
+    browser_possible = BROWSER_AVAILABLE and get_policy('browser').breaker.allow()
+    print(f"对冲模式: 立即使用urllib方式，{hedge_delay:.0f} 秒内未成功时启动浏览器自动化")
+    start('urllib', lambda: fetch_csrc_data(spec, cancel=cancelled))
+    deadline = time.monotonic() + hedge_delay
+    running = 1
+
+    while running:
+        wait = None
+        if browser_possible and not browser_started:
+            wait = max(0.0, deadline - time.monotonic())
+        try:
+            name, raw_data = results.get(timeout=wait)
+        except queue.Empty:
+            print(f"urllib 方式 {hedge_delay:.0f} 秒内未返回，启动浏览器自动化对冲")
+            start_browser()
+            running += 1
+            continue
+
+        running -= 1
+        if is_valid_result(raw_data):
+            print(f"采用 {name} 方式的结果")
+            # 另一方不再重试；浏览器获取器可能还在创建中，由对冲线程在创建后检查取消标志
+            cancelled.set()
+            if name == 'urllib' and browser_fetcher is not None:
+                browser_fetcher.cancel()
+            return raw_data
+
+        print(f"{name} 方式未获得有效结果")
+        if name == 'urllib' and browser_possible and not browser_started:
+            print("urllib 方式无效（可能遇到反爬虫），立即启动浏览器自动化")
+            start_browser()
+            running += 1
+
+    return None
+
+
+def send_notifications(new_data, changes=None):
+    """
+    发送新基金邮件通知
+    配置了订阅文件时按订阅规则给每个收件人发送各自的摘要，否则发送全部新数据给默认收件人
+    changes 不为 None 时发送更正通知，此时 new_data 为发生变更的记录，changes 为字段级变更明细
+    邮件发送失败不影响主程序继续运行
+    """
+    try:
+        from email_notifier import SimpleEmailNotifier
+        from subscriptions import load_subscription_matcher
+
+        # 创建邮件通知器
+        email_notifier = SimpleEmailNotifier()
+
+        # 检查是否配置了邮件功能
+        if not email_notifier.is_configured():
+            print("邮件功能未配置（如需使用，请设置环境变量：EMAIL_ADDRESS, EMAIL_PASSWORD）")
+            return
+
+        matcher = load_subscription_matcher()
+        if matcher is None:
+            print("正在发送邮件通知...")
+            digests = {None: new_data}
+        else:
+            digests = matcher.match_batch(new_data)
+            print(f"按订阅规则匹配到 {len(digests)} 个收件人，正在发送邮件通知...")
+
+        for recipient, records in digests.items():
+            # 发送邮件通知
+            recipients = [recipient] if recipient else None
+            if changes is None:
+                success = email_notifier.send_fund_notification(records, recipients)
+            else:
+                record_ids = {str(record.get('uploadInfoDetailId')) for record in records}
+                record_changes = [c for c in changes if c['uploadInfoDetailId'] in record_ids]
+                success = email_notifier.send_correction_notification(records, record_changes, recipients)
+
+            if success:
+                print("✅ 邮件通知发送成功")
+            else:
+                print("❌ 邮件通知发送失败")
+
+    except ImportError:
+        print("邮件模块导入失败，跳过邮件通知")
+    except Exception as e:
+        print(f"邮件通知发送异常: {e}")
+
+
 def save_fund_data_to_csv(fund_data, filename='data/csrc_fund_data.csv'):
-    """保存基金数据到 CSV 文件，以 uploadInfoDetailId 为主键进行去重"""
+    """
+    保存基金数据到 CSV 文件，以 uploadInfoDetailId 为主键进行去重
+    通过内容指纹识别已有记录的更正和内容变更，变更明细追加到 data/csrc_fund_changes.csv
+    写入过程持有进程间文件锁并原子替换文件，多个进程可以同时调用
+    """
 
     if not fund_data:
         print("没有数据需要保存")
@@ -166,109 +336,30 @@ def save_fund_data_to_csv(fund_data, filename='data/csrc_fund_data.csv'):
     os.makedirs('data', exist_ok=True)
 
     try:
-        # 获取当前时间
-        current_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-
-        # 如果文件已存在，先读取现有数据并创建以 uploadInfoDetailId 为键的字典
-        existing_data_dict = {}
-        if os.path.exists(filename):
-            with open(filename, 'r', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    # 使用 uploadInfoDetailId 作为主键，如果不存在则跳过
-                    if 'uploadInfoDetailId' in row:
-                        existing_data_dict[row['uploadInfoDetailId']] = row
-
-        # 准备新数据，同样以 uploadInfoDetailId 为键
+        # 准备新数据，以 uploadInfoDetailId 为键
         new_data_dict = {}
         for item in fund_data:
             # 确保有 uploadInfoDetailId 字段
             if 'uploadInfoDetailId' in item:
-                # 添加时间戳
-                item['fetched_at'] = current_time
                 new_data_dict[str(item['uploadInfoDetailId'])] = item
             else:
                 print(f"警告: 数据项缺少 uploadInfoDetailId 字段，已跳过: {item}")
 
-        # 检查是否有新数据
-        existing_ids = set(existing_data_dict.keys())
-        new_ids = set(new_data_dict.keys())
-
-        # 找出真正的新数据（不在现有数据中的）
-        truly_new_ids = new_ids - existing_ids
-
-        if not truly_new_ids:
-            print("没有新的数据需要保存")
-            return True
-
-        print(f"发现 {len(truly_new_ids)} 条新数据")
-
-        # 只处理新数据
-        final_new_data = {id_: new_data_dict[id_] for id_ in truly_new_ids}
-
-        # 获取新数据用于邮件通知
-        new_data_for_email = []
-        for id_ in truly_new_ids:
-            new_data_for_email.append(new_data_dict[id_])
-
-        # 合并数据，只添加新数据
-        merged_data_dict = existing_data_dict.copy()
-        merged_data_dict.update(final_new_data)
-
-        # 转换为列表并按 uploadInfoDetailId 排序
-        all_data = list(merged_data_dict.values())
-        all_data.sort(key=lambda x: int(x['uploadInfoDetailId']))
-
-        # 获取所有可能的字段
-        all_fields = set()
-        for item in all_data:
-            all_fields.update(item.keys())
-
-        # 定义核心字段的顺序，其他字段按字母顺序排列
-        core_fields = ['uploadInfoDetailId', 'fundCode', 'fundShortName', 'reportName',
-                      'organName', 'reportDesp', 'uploadDate', 'reportSendDate', 'fetched_at']
-        other_fields = sorted([f for f in all_fields if f not in core_fields])
-        all_fields = core_fields + other_fields
-
-        # 写入 CSV 文件
-        with open(filename, 'w', encoding='utf-8', newline='') as f:
-            writer = csv.DictWriter(f, fieldnames=all_fields)
-            writer.writeheader()
-            writer.writerows(all_data)
-
-        new_records_count = len(final_new_data)
-        total_records_count = len(all_data)
-        print(f"数据已保存到 {filename}")
-        print(f"新增记录: {new_records_count} 条")
-        print(f"总记录数: {total_records_count} 条")
+        # 只在合并写入阶段持有锁，获取数据阶段不受影响
+        with store_lock(filename):
+            # 时间戳在持有锁后生成，与各进程的提交顺序一致
+            current_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            for item in new_data_dict.values():
+                item['fetched_at'] = current_time
+            new_data_for_email, changed_data, changes = commit_batch(new_data_dict, filename, current_time)
 
         # 发送邮件通知（如果有新数据且配置了邮件功能）
         if new_data_for_email:
-            try:
-                from email_notifier import SimpleEmailNotifier
-
-                # 创建邮件通知器
-                email_notifier = SimpleEmailNotifier()
-
-                # 检查是否配置了邮件功能
-                if email_notifier.is_configured():
-                    print("正在发送邮件通知...")
-
-                    # 发送邮件通知
-                    success = email_notifier.send_fund_notification(new_data_for_email)
+            send_notifications(new_data_for_email)
 
-                    if success:
-                        print("✅ 邮件通知发送成功")
-                    else:
-                        print("❌ 邮件通知发送失败")
-                else:
-                    print("邮件功能未配置（如需使用，请设置环境变量：EMAIL_ADDRESS, EMAIL_PASSWORD）")
-
-            except ImportError:
-                print("邮件模块导入失败，跳过邮件通知")
-            except Exception as e:
-                print(f"邮件通知发送异常: {e}")
-                # 邮件发送失败不影响主程序继续运行
+        # 发送更正通知（需要设置 NOTIFY_CORRECTIONS=true）
+        if changed_data and os.environ.get('NOTIFY_CORRECTIONS', 'false').lower() == 'true':
+            send_notifications(changed_data, changes)
 
         return True
 
@@ -277,8 +368,37 @@ def save_fund_data_to_csv(fund_data, filename='data/csrc_fund_data.csv'):
         return False
 
 
-def fetch_and_save_data():
-    """执行一次数据获取和保存的完整流程"""
+def process_attachments(fund_data):
+    """
+    下载附件并增量更新全文索引（分别需要设置 DOWNLOAD_ATTACHMENTS=true 和 BUILD_FULLTEXT_INDEX=true）
+    附件清单、临时文件和索引段不支持多个进程同时写入，整个过程持有附件目录的进程间文件锁
+    """
+    if os.environ.get('DOWNLOAD_ATTACHMENTS', 'false').lower() != 'true':
+        return
+
+    from attachment_downloader import download_attachments, ATTACHMENT_ROOT
+    try:
+        with store_lock(ATTACHMENT_ROOT):
+            try:
+                download_attachments(fund_data)
+            except Exception as e:
+                print(f"附件下载出错: {e}")
+
+            if os.environ.get('BUILD_FULLTEXT_INDEX', 'false').lower() == 'true':
+                try:
+                    from fulltext_index import FulltextIndex
+                    FulltextIndex().update_from_manifest()
+                except Exception as e:
+                    print(f"全文索引更新出错: {e}")
+    except StoreLockTimeout as e:
+        print(f"其他进程正在下载附件，本次跳过: {e}")
+
+
+def fetch_and_save_data(spec=None, post_save=process_attachments):
+    """
+    执行一次数据获取和保存的完整流程，spec 为查询条件字典（默认查询 QDII 基金）
+    post_save 在保存成功后以本次获取的数据调用，默认下载附件并更新全文索引
+    """
     print(f"\n{'='*60}")
     print(f"开始获取 CSRC 基金数据... {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     print(f"数据来源: 资本市场电子化信息披露平台")
@@ -286,23 +406,35 @@ def fetch_and_save_data():
 
     raw_data = None
 
+    # 对冲模式：urllib 与浏览器竞速
+    if FETCH_MODE == 'hedged':
+        raw_data = fetch_hedged(spec)
+
     # 首先尝试使用浏览器自动化方式
-    if BROWSER_AVAILABLE and os.environ.get('USE_BROWSER_FETCHER', 'false').lower() == 'true':
+    elif BROWSER_AVAILABLE and os.environ.get('USE_BROWSER_FETCHER', 'false').lower() == 'true':
         print("尝试使用浏览器自动化获取数据...")
         try:
-            raw_data = fetch_csrc_data_browser()
-            if raw_data:
-                print(f"浏览器自动化获取成功，共 {len(raw_data)} 条数据")
-            else:
-                print("浏览器自动化获取失败，将尝试urllib方式")
+            from browser_fetcher import fetch_csrc_data_browser
+
+            def browser_once():
+                data = fetch_csrc_data_browser(spec)
+                if not data:
+                    raise RuntimeError("浏览器自动化获取失败")
+                return data
+
+            # 浏览器方式连续失败后熔断，冷却期内直接使用urllib方式
+            raw_data = get_policy('browser').call(browser_once)
+            print(f"浏览器自动化获取成功，共 {len(raw_data)} 条数据")
+        except CircuitOpenError as e:
+            print(f"跳过浏览器自动化: {e}")
         except Exception as e:
             print(f"浏览器自动化出错: {e}")
             print("将尝试urllib方式")
 
     # 如果浏览器方式失败，尝试urllib方式
-    if raw_data is None:
+    if raw_data is None and FETCH_MODE != 'hedged':
         print("使用urllib方式获取数据...")
-        raw_data = fetch_csrc_data()
+        raw_data = fetch_csrc_data(spec)
 
     if raw_data is None:
         print("❌ 获取数据失败")
@@ -326,23 +458,176 @@ def fetch_and_save_data():
         print("❌ 数据保存失败!")
         return False
 
+    post_save(fund_data)
+
     print(f"\n{'='*60}")
     print(f"任务完成 {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     print(f"{'='*60}\n")
     return True
 
 
-def run_with_schedule(interval_minutes=30):
+def _fetch_and_save_spec(spec):
+    """进程池中执行一个查询条件，返回 (是否成功, 获取的数据)，附件下载和全文索引由父进程统一执行"""
+    fund_data = []
+    success = fetch_and_save_data(spec, post_save=fund_data.extend)
+    return success, fund_data
+
+
+def run_query_specs(specs, processes):
+    """
+    多进程并发执行多个查询条件：每个进程负责一个查询条件，
+    各自获取数据后提交到同一个数据文件（合并写入阶段由文件锁保证互斥），
+    全部完成后由父进程统一下载附件和更新全文索引
+    :return: 全部查询条件都成功时返回 True
+    """
+    processes = max(1, min(processes, len(specs)))
+    print(f"共 {len(specs)} 个查询条件，使用 {processes} 个进程并发执行")
+    with multiprocessing.Pool(processes) as pool:
+        results = pool.map(_fetch_and_save_spec, specs)
+    successes = [success for success, _ in results]
+    print(f"查询条件执行完成: 成功 {sum(successes)} 个，失败 {len(successes) - sum(successes)} 个")
+
+    fund_data = [record for _, records in results for record in records]
+    if fund_data:
+        process_attachments(fund_data)
+    return all(successes)
+
+
+def run_worker(worker, queue_path):
+    """
+    工作进程：从任务队列领取分片，使用本进程自己的浏览器会话（启用浏览器方式时）或 urllib 获取数据，
+    结果批次写回任务队列，由协调者统一保存
+    """
+    work_queue = WorkQueue(queue_path)
+    fetcher = None
+    if BROWSER_AVAILABLE and os.environ.get('USE_BROWSER_FETCHER', 'false').lower() == 'true':
+        try:
+            from browser_fetcher import CSRCBrowserFetcher
+            fetcher = CSRCBrowserFetcher()
+            fetcher.open_session()
+        except Exception as e:
+            print(f"{worker} 浏览器会话建立失败，改用urllib方式: {e}")
+            if fetcher is not None:
+                fetcher.close()
+            fetcher = None
+
+    try:
+        while True:
+            task = work_queue.claim(worker)
+            if task is None:
+                break
+            task_id, spec = task
+            print(f"{worker} 开始处理分片 {task_id}: {spec['startUploadDate']} ~ {spec['endUploadDate']}")
+
+            start_time = time.monotonic()
+            fund_data = None
+            try:
+                if fetcher is not None:
+                    fund_data = fetcher.fetch_all_pages(spec)
+                else:
+                    fund_data = fetch_all_pages(spec)
+            except Exception as e:
+                print(f"{worker} 处理分片 {task_id} 出错: {e}")
+            elapsed = time.monotonic() - start_time
+
+            if fund_data is None:
+                work_queue.fail(task_id, elapsed)
+            else:
+                work_queue.complete(task_id, fund_data, elapsed)
+    finally:
+        if fetcher is not None:
+            fetcher.close()
+        work_queue.close()
+
+
+def run_coordinator(specs, workers, shard_days=None):
+    """
+    协调者/工作进程模式：查询条件按上传日期切分为分片放入 SQLite 任务队列，由 workers 个工作进程并发获取，
+    协调者收集各进程的结果批次，去重后通过 save_fund_data_to_csv 统一保存和发送通知
+    :return: 全部分片都获取成功且保存成功时返回 True
+    """
+    shards = shard_specs(specs, shard_days)
+    workers = max(1, min(workers, len(shards)))
+    print(f"共 {len(specs)} 个查询条件，切分为 {len(shards)} 个分片，使用 {workers} 个工作进程")
+
+    fd, queue_path = tempfile.mkstemp(prefix='csrc-work-queue-', suffix='.sqlite3')
+    os.close(fd)
+    work_queue = WorkQueue(queue_path)
+    start_time = time.monotonic()
+    try:
+        work_queue.add_tasks(shards)
+        started = 0
+        running = []
+
+        def start_worker():
+            nonlocal started
+            name = f"worker-{started}"
+            started += 1
+            process = multiprocessing.Process(target=run_worker, args=(name, queue_path), name=name)
+            process.start()
+            running.append(process)
+
+        for _ in range(workers):
+            start_worker()
+
+        # 边获取边收集结果批次，以 uploadInfoDetailId 去重
+        collected = {}
+        while True:
+            for batch in work_queue.take_batches():
+                for item in batch:
+                    if 'uploadInfoDetailId' in item:
+                        collected[str(item['uploadInfoDetailId'])] = FundRecord.from_dict(item)
+            if not running:
+                break
+            time.sleep(0.2)
+            for process in [p for p in running if not p.is_alive()]:
+                running.remove(process)
+                if process.exitcode:
+                    requeued = work_queue.requeue_worker(process.name)
+                    print(f"⚠️  {process.name} 异常退出（退出码 {process.exitcode}），{requeued} 个分片重新排队")
+
+            # 重新排队的分片可能已经没有存活的工作进程领取，补充新的工作进程，直到队列中没有待处理分片
+            pending = work_queue.counts().get('pending', 0)
+            for _ in range(min(workers, pending) - len(running)):
+                start_worker()
+                print(f"启动替补工作进程 {running[-1].name}（{pending} 个分片待处理）")
+
+        elapsed = time.monotonic() - start_time
+        counts = work_queue.counts()
+        print(f"\n分片执行完成: 成功 {counts.get('done', 0)} 个，失败 {counts.get('failed', 0)} 个，"
+              f"未处理 {counts.get('pending', 0) + counts.get('running', 0)} 个，用时 {elapsed:.1f} 秒")
+        for worker, stats in work_queue.worker_stats().items():
+            rate = stats['records'] / stats['seconds'] if stats['seconds'] else 0
+            print(f"  {worker}: 分片 {stats['done']} 个成功 / {stats['failed']} 个失败，"
+                  f"{stats['records']} 条记录，获取耗时 {stats['seconds']:.1f} 秒（{rate:.1f} 条/秒）")
+        print(f"去重后共 {len(collected)} 条记录")
+
+        success = counts.get('done', 0) == len(shards)
+    finally:
+        work_queue.close()
+        for path in (queue_path, f"{queue_path}-wal", f"{queue_path}-shm"):
+            if os.path.exists(path):
+                os.remove(path)
+
+    if collected:
+        fund_data = list(collected.values())
+        if not save_fund_data_to_csv(fund_data):
+            return False
+        process_attachments(fund_data)
+    return success
+
+
+def run_with_schedule(interval_minutes=30, task=fetch_and_save_data):
     """使用 schedule 库运行定时任务"""
     print(f"📅 使用 schedule 库启动定时任务")
     print(f"⏰ 执行间隔: 每 {interval_minutes} 分钟")
     print(f"🔄 按 Ctrl+C 停止任务\n")
 
     # 立即执行一次
-    fetch_and_save_data()
+    task()
 
     # 设置定时任务
-    schedule.every(interval_minutes).minutes.do(fetch_and_save_data)
+    schedule.every(interval_minutes).minutes.do(task)
 
     # 持续运行
     try:
@@ -353,7 +638,7 @@ def run_with_schedule(interval_minutes=30):
         print("\n\n⏹️  收到停止信号，退出定时任务")
 
 
-def run_with_simple_loop(interval_minutes=30):
+def run_with_simple_loop(interval_minutes=30, task=fetch_and_save_data):
     """使用简单的循环和 sleep 运行定时任务"""
     print(f"📅 使用简单循环启动定时任务")
     print(f"⏰ 执行间隔: 每 {interval_minutes} 分钟")
@@ -362,7 +647,7 @@ def run_with_simple_loop(interval_minutes=30):
     try:
         while True:
             # 执行任务
-            fetch_and_save_data()
+            task()
 
             # 等待指定时间
             interval_seconds = interval_minutes * 60
@@ -392,6 +677,15 @@ def main():
 
   # 每10分钟执行一次
   python fetch_csrc_data.py --schedule --interval 10
+
+  # 按查询条件文件执行，4个进程并发
+  python fetch_csrc_data.py --query-specs specs.json --processes 4
+
+  # 协调者/工作进程模式：查询条件按7天切分为分片，8个工作进程并发获取
+  python fetch_csrc_data.py --query-specs specs.json --workers 8 --shard-days 7
+
+  # 定时任务模式，同时在 8080 端口提供只读接口
+  python fetch_csrc_data.py --schedule --serve --port 8080
         """
     )
 
@@ -408,22 +702,78 @@ def main():
         help='定时任务执行间隔（分钟），默认30分钟'
     )
 
+    parser.add_argument(
+        '--query-specs',
+        help='查询条件文件（JSON 字典列表），每个字典覆盖默认查询条件，例如 {"fundCompanyShortName": "南方"}'
+    )
+
+    parser.add_argument(
+        '--processes',
+        type=int,
+        default=1,
+        help='执行查询条件文件时的并发进程数，默认1'
+    )
+
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=0,
+        help='协调者/工作进程模式的工作进程数，大于0时启用（优先于 --processes）'
+    )
+
+    parser.add_argument(
+        '--shard-days',
+        type=int,
+        default=7,
+        help='协调者/工作进程模式下每个分片覆盖的上传日期天数，0表示不按日期切分，默认7'
+    )
+
+    parser.add_argument(
+        '--serve',
+        action='store_true',
+        help='定时任务模式下同时启动本地只读 HTTP 接口'
+    )
+
+    parser.add_argument(
+        '--port',
+        type=int,
+        default=8080,
+        help='只读接口监听端口，默认8080'
+    )
+
     args = parser.parse_args()
 
+    task = fetch_and_save_data
+    specs = [{}]
+    if args.query_specs:
+        try:
+            specs = load_query_specs(args.query_specs)
+        except (OSError, ValueError) as e:
+            print(f"❌ 错误: 读取查询条件文件失败: {e}")
+            sys.exit(1)
+        task = lambda: run_query_specs(specs, args.processes)
+
+    if args.workers > 0:
+        task = lambda: run_coordinator(specs, args.workers, args.shard_days)
+
     if args.schedule:
         # 定时任务模式
         if args.interval <= 0:
             print("❌ 错误: 间隔时间必须大于0")
             sys.exit(1)
 
+        if args.serve:
+            from read_api import start_read_api
+            start_read_api(port=args.port)
+
         # 优先使用 schedule 库，如果不可用则使用简单循环
         if SCHEDULE_AVAILABLE:
-            run_with_schedule(args.interval)
+            run_with_schedule(args.interval, task)
         else:
-            run_with_simple_loop(args.interval)
+            run_with_simple_loop(args.interval, task)
     else:
         # 单次执行模式
-        success = fetch_and_save_data()
+        success = task()
         sys.exit(0 if success else 1)
 
 
@@ -0,0 +1,382 @@
+#!/usr/bin/env python3
+"""
+招募说明书全文倒排索引
+从已下载的附件中提取文本，中文按二元组（n-gram）切分，英文和数字按单词切分，
+以 uploadInfoDetailId 为文档编号增量写入磁盘上的索引段，支持布尔查询、短语查询和索引段合并
+
+用法:
+  python fulltext_index.py build              # 索引新下载的附件
+  python fulltext_index.py search '日本 AND 股票'
+  python fulltext_index.py search '"日本股票" OR 东京'
+  python fulltext_index.py merge              # 合并全部索引段
+"""
+
+import os
+import re
+import sys
+import json
+import html
+
+# PDF 文本提取需要 pypdf，未安装时跳过 PDF 附件
+try:
+    from pypdf import PdfReader
+    PDF_AVAILABLE = True
+except ImportError:
+    PDF_AVAILABLE = False
+
+
+INDEX_DIR = os.environ.get('FULLTEXT_INDEX_DIR', 'data/index')
+NGRAM_SIZE = 2
+# 索引段数量超过该值时自动合并
+MAX_SEGMENTS = int(os.environ.get('FULLTEXT_MAX_SEGMENTS', '8'))
+
+# 连续的中文字符，或连续的英文字母/数字
+TOKEN_RUN_PATTERN = re.compile(r'[㐀-䶿一-鿿豈-﫿]+|[0-9A-Za-z]+')
+CJK_PATTERN = re.compile(r'[㐀-䶿一-鿿豈-﫿]')
+HTML_TAG_PATTERN = re.compile(r'<[^>]+>')
+QUERY_TOKEN_PATTERN = re.compile(r'"([^"]*)"|(\()|(\))|([^\s()"]+)')
+
+
+def tokenize(text):
+    """
+    切分文本，返回 (词项, 位置) 列表
+    中文连续字符切成相互重叠的二元组，单个中文字符保留为一元词项；
+    不同片段之间的位置留出间隔，避免短语跨标点或跨片段匹配
+    """
+    tokens = []
+    position = 0
+    for match in TOKEN_RUN_PATTERN.finditer(text):
+        run = match.group()
+        if CJK_PATTERN.match(run):
+            if len(run) < NGRAM_SIZE:
+                tokens.append((run, position))
+                position += 1
+            else:
+                for i in range(len(run) - NGRAM_SIZE + 1):
+                    tokens.append((run[i:i + NGRAM_SIZE], position))
+                    position += 1
+        else:
+            tokens.append((run.lower(), position))
+            position += 1
+        position += 1
+    return tokens
+
+
+def extract_text(path):
+    """从附件中提取文本，不支持的格式返回 None"""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.pdf':
+        if not PDF_AVAILABLE:
+            return None
+        reader = PdfReader(path)
+        return '\n'.join(page.extract_text() or '' for page in reader.pages)
+    if ext in ('.txt', '.htm', '.html'):
+        with open(path, 'rb') as f:
+            raw = f.read()
+        for encoding in ('utf-8', 'gb18030'):
+            try:
+                text = raw.decode(encoding)
+                break
+            except UnicodeDecodeError:
+                continue
+        else:
+            text = raw.decode('utf-8', errors='ignore')
+        if ext != '.txt':
+            text = html.unescape(HTML_TAG_PATTERN.sub(' ', text))
+        return text
+    return None
+
+
+def _write_json_atomic(path, data):
+    """先写临时文件再替换，避免中断时留下损坏的索引文件"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(tmp_path, path)
+
+
+class FulltextIndex:
+    """磁盘上的分段倒排索引"""
+
+    def __init__(self, index_dir=INDEX_DIR):
+        self.index_dir = index_dir
+        self.meta_path = os.path.join(index_dir, 'index.json')
+        self.meta = self._load_meta()
+        self._segment_cache = {}
+
+    def _load_meta(self):
+        """
+        读取索引元数据
+        segments: 索引段文件名列表（从旧到新）
+        docs: {文档编号: {'segment': 所在索引段, 'sha256': 附件内容哈希}}，同一文档以最新的索引段为准
+        """
+        if os.path.exists(self.meta_path):
+            with open(self.meta_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        return {'segments': [], 'next_segment': 1, 'docs': {}}
+
+    def _save_meta(self):
+        os.makedirs(self.index_dir, exist_ok=True)
+        _write_json_atomic(self.meta_path, self.meta)
+
+    def _load_segment(self, name):
+        """读取索引段 {'docs': {文档编号: 词项数}, 'postings': {词项: {文档编号: [位置, ...]}}}"""
+        if name not in self._segment_cache:
+            with open(os.path.join(self.index_dir, name), 'r', encoding='utf-8') as f:
+                self._segment_cache[name] = json.load(f)
+        return self._segment_cache[name]
+
+    def _write_segment(self, docs, postings):
+        """写入一个新的索引段，返回索引段文件名"""
+        name = f"seg_{self.meta['next_segment']:06d}.json"
+        self.meta['next_segment'] += 1
+        os.makedirs(self.index_dir, exist_ok=True)
+        _write_json_atomic(os.path.join(self.index_dir, name), {'docs': docs, 'postings': postings})
+        return name
+
+    def add_documents(self, documents):
+        """
+        把一批文档写入新的索引段
+        :param documents: [(文档编号, 附件内容哈希, 文本), ...]
+        :return: 写入的文档数
+        """
+        docs = {}
+        postings = {}
+        for doc_id, sha256, text in documents:
+            tokens = tokenize(text)
+            docs[doc_id] = len(tokens)
+            for term, position in tokens:
+                postings.setdefault(term, {}).setdefault(doc_id, []).append(position)
+
+        if not docs:
+            return 0
+
+        name = self._write_segment(docs, postings)
+        self.meta['segments'].append(name)
+        for doc_id, sha256, _ in documents:
+            self.meta['docs'][doc_id] = {'segment': name, 'sha256': sha256}
+        self._save_meta()
+
+        if len(self.meta['segments']) > MAX_SEGMENTS:
+            self.merge_segments()
+        return len(docs)
+
+    def update_from_manifest(self, downloader_root=None):
+        """
+        增量索引：只处理附件清单中尚未索引或附件内容已变化的文档
+        同一附件内容只提取一次文本
+        :return: 新索引的文档数
+        """
+        from attachment_downloader import AttachmentDownloader, ATTACHMENT_ROOT
+
+        downloader = AttachmentDownloader(downloader_root or ATTACHMENT_ROOT)
+        pending = [entry for doc_id, entry in downloader.manifest.items()
+                   if self.meta['docs'].get(doc_id, {}).get('sha256') != entry['sha256']]
+        if not pending:
+            print("没有需要索引的新文档")
+            return 0
+
+        if not PDF_AVAILABLE:
+            print("提示: 安装 pypdf 库后才能索引 PDF 附件: pip install pypdf")
+
+        texts = {}
+        documents = []
+        for entry in pending:
+            sha256 = entry['sha256']
+            if sha256 not in texts:
+                try:
+                    texts[sha256] = extract_text(downloader.blob_path(sha256, entry['ext']))
+                except Exception as e:
+                    print(f"提取文本失败 {entry['uploadInfoDetailId']}: {e}")
+                    texts[sha256] = None
+            if texts[sha256]:
+                documents.append((entry['uploadInfoDetailId'], sha256, texts[sha256]))
+
+        count = self.add_documents(documents)
+        print(f"全文索引完成: 新索引 {count} 个文档，共 {len(self.meta['docs'])} 个文档")
+        return count
+
+    def merge_segments(self):
+        """把全部索引段合并为一个，丢弃已被新版本覆盖的文档"""
+        if len(self.meta['segments']) <= 1:
+            return
+
+        merged_docs = {}
+        merged_postings = {}
+        for name in self.meta['segments']:
+            segment = self._load_segment(name)
+            live = {doc_id for doc_id in segment['docs'] if self.meta['docs'].get(doc_id, {}).get('segment') == name}
+            for doc_id in live:
+                merged_docs[doc_id] = segment['docs'][doc_id]
+            for term, doc_positions in segment['postings'].items():
+                for doc_id, positions in doc_positions.items():
+                    if doc_id in live:
+                        merged_postings.setdefault(term, {})[doc_id] = positions
+
+        old_segments = self.meta['segments']
+        name = self._write_segment(merged_docs, merged_postings)
+        self.meta['segments'] = [name]
+        for doc_id in merged_docs:
+            self.meta['docs'][doc_id]['segment'] = name
+        self._save_meta()
+
+        for old_name in old_segments:
+            self._segment_cache.pop(old_name, None)
+            os.remove(os.path.join(self.index_dir, old_name))
+        print(f"已合并 {len(old_segments)} 个索引段")
+
+    def postings(self, term):
+        """返回词项在全部有效文档中的位置 {文档编号: [位置, ...]}"""
+        result = {}
+        for name in self.meta['segments']:
+            for doc_id, positions in self._load_segment(name)['postings'].get(term, {}).items():
+                if self.meta['docs'].get(doc_id, {}).get('segment') == name:
+                    result[doc_id] = positions
+        return result
+
+    def match_character(self, char):
+        """单个中文字符没有对应的二元组词项，需要扫描词典找出包含该字符的词项"""
+        matched = set()
+        for name in self.meta['segments']:
+            for term, doc_positions in self._load_segment(name)['postings'].items():
+                if char in term:
+                    matched.update(doc_id for doc_id in doc_positions
+                                   if self.meta['docs'].get(doc_id, {}).get('segment') == name)
+        return matched
+
+    def match_phrase(self, text):
+        """返回包含该文本（按相对位置连续出现）的文档编号集合"""
+        tokens = tokenize(text)
+        if not tokens:
+            return set()
+        if len(tokens) == 1 and len(tokens[0][0]) < NGRAM_SIZE and CJK_PATTERN.match(tokens[0][0]):
+            return self.match_character(tokens[0][0])
+
+        term_postings = [(self.postings(term), position - tokens[0][1]) for term, position in tokens]
+        candidates = set(term_postings[0][0])
+        for doc_positions, _ in term_postings[1:]:
+            candidates &= doc_positions.keys()
+        if len(tokens) == 1:
+            return candidates
+
+        matched = set()
+        for doc_id in candidates:
+            position_sets = [(set(doc_positions[doc_id]), offset) for doc_positions, offset in term_postings[1:]]
+            for start in term_postings[0][0][doc_id]:
+                if all(start + offset in positions for positions, offset in position_sets):
+                    matched.add(doc_id)
+                    break
+        return matched
+
+    def search(self, query):
+        """
+        布尔查询：支持 AND、OR、NOT、括号和双引号短语，相邻的词默认为 AND
+        多于两个字的中文词自动按短语匹配
+        :return: 匹配的文档编号列表（按编号排序）
+        """
+        parser = _QueryParser(query, self)
+        result = parser.parse()
+        return sorted(result, key=lambda x: (len(x), x))
+
+
+class _QueryParser:
+    """递归下降查询解析器，优先级 NOT > AND > OR"""
+
+    def __init__(self, query, index):
+        self.tokens = []
+        for phrase, lparen, rparen, word in QUERY_TOKEN_PATTERN.findall(query):
+            if lparen or rparen:
+                self.tokens.append(('op', lparen or rparen))
+            elif word in ('AND', 'OR', 'NOT'):
+                self.tokens.append(('op', word))
+            else:
+                self.tokens.append(('term', phrase if phrase else word))
+        self.pos = 0
+        self.index = index
+
+    def _peek(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else (None, None)
+
+    def parse(self):
+        if not self.tokens:
+            return set()
+        result = self._parse_or()
+        if self.pos != len(self.tokens):
+            raise ValueError(f"查询语法错误: 无法解析 '{self._peek()[1]}'")
+        return result
+
+    def _parse_or(self):
+        result = self._parse_and()
+        while self._peek() == ('op', 'OR'):
+            self.pos += 1
+            result = result | self._parse_and()
+        return result
+
+    def _parse_and(self):
+        result = self._parse_not()
+        while True:
+            kind, value = self._peek()
+            if (kind, value) == ('op', 'AND'):
+                self.pos += 1
+            elif kind != 'term' and value not in ('NOT', '('):
+                return result
+            result = result & self._parse_not()
+
+    def _parse_not(self):
+        if self._peek() == ('op', 'NOT'):
+            self.pos += 1
+            return set(self.index.meta['docs']) - self._parse_not()
+        return self._parse_atom()
+
+    def _parse_atom(self):
+        kind, value = self._peek()
+        if kind is None:
+            raise ValueError("查询语法错误: 查询意外结束")
+        self.pos += 1
+        if kind == 'term':
+            return self.index.match_phrase(value)
+        if value == '(':
+            result = self._parse_or()
+            if self._peek() != ('op', ')'):
+                raise ValueError("查询语法错误: 缺少右括号")
+            self.pos += 1
+            return result
+        raise ValueError(f"查询语法错误: 意外的 '{value}'")
+
+
+def _load_fund_names(filename='data/csrc_fund_data.csv'):
+    """读取基金名称用于展示搜索结果"""
+    from fund_store import load_store_records
+    names = {}
+    for id_, record in load_store_records(filename).items():
+        names[id_] = f"{record.get('fundCode', '')} {record.get('fundShortName', '')}"
+    return names
+
+
+def main():
+    if len(sys.argv) < 2 or sys.argv[1] not in ('build', 'search', 'merge'):
+        print(__doc__)
+        sys.exit(1)
+
+    index = FulltextIndex()
+    command = sys.argv[1]
+
+    if command == 'build':
+        index.update_from_manifest()
+    elif command == 'merge':
+        index.merge_segments()
+    else:
+        query = ' '.join(sys.argv[2:])
+        try:
+            doc_ids = index.search(query)
+        except ValueError as e:
+            print(f"❌ {e}")
+            sys.exit(1)
+        names = _load_fund_names()
+        print(f"查询 {query} 命中 {len(doc_ids)} 个文档")
+        for doc_id in doc_ids:
+            print(f"  {doc_id}  {names.get(doc_id, '')}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+基金记录的紧凑表示
+固定字段使用 __slots__ 存储，未知字段放入 extra 字典；
+机构名称、报告类型等高重复度的字符串值会被驻留（intern），相同的值在内存中只保存一份
+FundRecord 实现了字典的常用接口，可以直接用于 csv.DictWriter、邮件通知和订阅匹配
+"""
+
+import sys
+
+
+# 固定字段（与数据文件的列一致）
+FUND_FIELDS = (
+    'uploadInfoDetailId', 'fundCode', 'fundShortName', 'reportName', 'organName', 'reportDesp',
+    'uploadDate', 'reportSendDate', 'fetched_at', 'commit_seq', 'attachFileName', 'correctionsNum',
+    'createTime', 'fundId', 'fundSign', 'isShowInfo', 'operationUploadType', 'reportCode', 'reportDespNew',
+    'reportYear', 'tableName', 'uploadInfoId',
+)
+_FUND_FIELD_SET = frozenset(FUND_FIELDS)
+
+# 取值高度重复的字段，字符串值会被驻留
+INTERNED_FIELDS = frozenset({
+    'organName', 'reportDesp', 'reportDespNew', 'fundSign', 'tableName', 'reportCode', 'reportYear',
+    'isShowInfo', 'operationUploadType', 'correctionsNum', 'uploadDate', 'reportSendDate', 'fetched_at',
+})
+
+_intern = sys.intern
+
+
+class FundRecord:
+    """一条基金公告记录"""
+
+    __slots__ = FUND_FIELDS + ('extra',)
+
+    def __init__(self, fields=None, **kwargs):
+        self.extra = None
+        if fields:
+            self.update(fields)
+        if kwargs:
+            self.update(kwargs)
+
+    @classmethod
+    def from_dict(cls, data):
+        """从字典（API 响应或 csv.DictReader 的行）创建记录，加载大量历史数据时的快速路径"""
+        record = cls.__new__(cls)
+        record.extra = None
+        for key, value in data.items():
+            if key in _FUND_FIELD_SET:
+                if key in INTERNED_FIELDS and type(value) is str:
+                    value = _intern(value)
+                setattr(record, key, value)
+            else:
+                if record.extra is None:
+                    record.extra = {}
+                record.extra[key] = value
+        return record
+
+    def to_dict(self):
+        """转换为普通字典"""
+        return dict(self.items())
+
+    def __getitem__(self, key):
+        if key in _FUND_FIELD_SET:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        if self.extra is not None and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        if key in _FUND_FIELD_SET:
+            if key in INTERNED_FIELDS and type(value) is str:
+                value = _intern(value)
+            setattr(self, key, value)
+        else:
+            if self.extra is None:
+                self.extra = {}
+            self.extra[key] = value
+
+    def __delitem__(self, key):
+        if key in _FUND_FIELD_SET:
+            try:
+                delattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        elif self.extra is not None and key in self.extra:
+            del self.extra[key]
+        else:
+            raise KeyError(key)
+
+    def __contains__(self, key):
+        if key in _FUND_FIELD_SET:
+            return hasattr(self, key)
+        return self.extra is not None and key in self.extra
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def keys(self):
+        """返回支持集合运算的有序键视图（csv.DictWriter 需要对键做集合差运算）"""
+        keys = [field for field in FUND_FIELDS if hasattr(self, field)]
+        if self.extra:
+            keys.extend(self.extra)
+        return dict.fromkeys(keys).keys()
+
+    def items(self):
+        return [(key, self[key]) for key in self.keys()]
+
+    def values(self):
+        return [self[key] for key in self.keys()]
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.keys())
+
+    def update(self, other):
+        for key, value in (other.items() if hasattr(other, 'items') else other):
+            self[key] = value
+
+    def copy(self):
+        return FundRecord(self)
+
+    def __eq__(self, other):
+        if isinstance(other, FundRecord):
+            return self.items() == other.items()
+        if isinstance(other, dict):
+            return self.to_dict() == other
+        return NotImplemented
+
+    def __repr__(self):
+        return f"FundRecord({self.to_dict()!r})"
+
+
+def row_loader(header):
+    """
+    根据 CSV 表头生成按列表行创建记录的函数，表头只解析一次，
+    跳过 csv.DictReader 为每行创建的中间字典
+    """
+    columns = []
+    for index, key in enumerate(header):
+        columns.append((index, key, key in _FUND_FIELD_SET, key in INTERNED_FIELDS))
+    new = FundRecord.__new__
+
+    def load(row):
+        record = new(FundRecord)
+        record.extra = None
+        width = len(row)
+        for index, key, is_slot, interned in columns:
+            value = row[index] if index < width else ''
+            if is_slot:
+                setattr(record, key, _intern(value) if interned else value)
+            else:
+                if record.extra is None:
+                    record.extra = {}
+                record.extra[key] = value
+        return record
+
+    return load
+
+
+def extra_fields(records):
+    """返回一批记录中出现的全部非固定字段（只检查带有额外字段的记录）"""
+    fields = set()
+    for record in records:
+        if record.extra:
+            fields.update(record.extra)
+    return fields
@@ -0,0 +1,398 @@
+#!/usr/bin/env python3
+"""
+基金数据存储辅助模块
+为每条记录计算内容指纹并保存在 ID 旁边的指纹索引文件中，
+新一批数据只需与指纹索引比较即可分为新增、变更和未变化三类，无需重新读取完整的历史记录
+
+写入支持多进程并发：合并写入阶段持有建议锁（带超时），
+文件先写入同目录的临时文件，fsync 后原子替换，进程崩溃不会留下截断的数据文件
+
+EXPORT_MODE=delta 时不再重写完整的数据文件，新增和变更的记录写入按日的增量文件（见 delta_store.py）
+"""
+
+import os
+import csv
+import time
+import hashlib
+import tempfile
+from contextlib import contextmanager
+
+from fund_record import FundRecord, FUND_FIELDS, extra_fields, row_loader
+
+# 进程间文件锁：POSIX 使用 fcntl，Windows 使用 msvcrt
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+
+# 计算指纹时忽略的字段（由本程序写入，不属于披露内容）
+FINGERPRINT_IGNORED_FIELDS = {'fetched_at', 'commit_seq'}
+
+DEFAULT_DATA_FILE = 'data/csrc_fund_data.csv'
+CHANGES_FILE = 'data/csrc_fund_changes.csv'
+CHANGE_LOG_FIELDS = ['detected_at', 'uploadInfoDetailId', 'fundCode', 'field', 'old_value', 'new_value', 'commit_seq']
+
+# 数据文件核心字段的顺序，其他字段按字母顺序排列在后面
+CORE_FIELDS = ['uploadInfoDetailId', 'fundCode', 'fundShortName', 'reportName',
+               'organName', 'reportDesp', 'uploadDate', 'reportSendDate', 'fetched_at', 'commit_seq']
+
+STORE_LOCK_TIMEOUT = float(os.environ.get('STORE_LOCK_TIMEOUT', '120'))
+
+# 导出模式：full 重写完整数据文件，delta 只写入当天的增量文件
+EXPORT_MODE = os.environ.get('EXPORT_MODE', 'full').lower()
+
+
+class StoreLockTimeout(Exception):
+    """等待数据文件锁超时"""
+
+
+def _try_lock(f):
+    """尝试以非阻塞方式获取排他锁，成功返回 True"""
+    try:
+        if fcntl:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+        return True
+    except OSError:
+        return False
+
+
+def _unlock(f):
+    if fcntl:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+@contextmanager
+def store_lock(filename, timeout=STORE_LOCK_TIMEOUT):
+    """
+    数据文件的进程间建议锁，锁文件为 filename + '.lock'
+    进程退出（包括崩溃）时操作系统会自动释放锁
+    :raises StoreLockTimeout: 超过 timeout 秒仍未获得锁
+    """
+    lock_path = f"{filename}.lock"
+    os.makedirs(os.path.dirname(lock_path) or '.', exist_ok=True)
+    deadline = time.monotonic() + timeout
+    with open(lock_path, 'a+') as f:
+        while not _try_lock(f):
+            if time.monotonic() >= deadline:
+                raise StoreLockTimeout(f"等待数据文件锁超时（{timeout} 秒）: {lock_path}")
+            time.sleep(0.1)
+        try:
+            yield
+        finally:
+            _unlock(f)
+
+
+@contextmanager
+def atomic_write(path, encoding='utf-8', newline=''):
+    """
+    原子写入文件：写入同目录的临时文件，fsync 后用 os.replace 替换目标文件
+    写入过程中出错时删除临时文件，目标文件保持原样
+    """
+    directory = os.path.dirname(path) or '.'
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{os.path.basename(path)}.", suffix='.tmp', dir=directory)
+    # mkstemp 创建的文件权限为 0600，保持与原文件一致
+    os.chmod(tmp_path, os.stat(path).st_mode & 0o777 if os.path.exists(path) else 0o644)
+    try:
+        with os.fdopen(fd, 'w', encoding=encoding, newline=newline) as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    # 同步目录项，保证替换操作本身落盘（Windows 不支持打开目录）
+    if hasattr(os, 'O_DIRECTORY'):
+        dir_fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+
+def _normalize(value):
+    """None 与空字符串等价，其余值统一转为去除首尾空白的字符串（与 CSV 读出的值保持一致）"""
+    if value is None:
+        return ''
+    return str(value).strip()
+
+
+def record_fingerprint(record):
+    """计算记录的内容指纹，空值字段不参与计算，因此缺少字段与空字段视为相同"""
+    items = sorted((key, _normalize(value)) for key, value in record.items()
+                   if key not in FINGERPRINT_IGNORED_FIELDS and _normalize(value))
+    digest = hashlib.blake2b(digest_size=8)
+    for key, value in items:
+        digest.update(key.encode('utf-8'))
+        digest.update(b'\x1f')
+        digest.update(value.encode('utf-8'))
+        digest.update(b'\x1e')
+    return digest.hexdigest()
+
+
+def fingerprint_path(filename):
+    """指纹索引文件路径，例如 data/csrc_fund_data.fingerprints.csv"""
+    base, _ = os.path.splitext(filename)
+    return f"{base}.fingerprints.csv"
+
+
+def change_log_path(filename):
+    """变更日志路径：默认数据文件对应 data/csrc_fund_changes.csv，其他数据文件为同目录的 <文件名>.changes.csv"""
+    if os.path.normpath(filename) == os.path.normpath(DEFAULT_DATA_FILE):
+        return CHANGES_FILE
+    base, _ = os.path.splitext(filename)
+    return f"{base}.changes.csv"
+
+
+def store_files(filename):
+    """组成存储当前状态的文件：full 模式为数据文件，delta 模式为基线数据文件、年度快照和增量文件"""
+    if EXPORT_MODE == 'delta':
+        from delta_store import state_files
+        return state_files(filename)
+    return [filename] if os.path.exists(filename) else []
+
+
+def store_signature(filename):
+    """存储当前状态的签名：各文件的路径、大小和修改时间，文件在本程序之外被修改、新增或删除时签名随之变化"""
+    digest = hashlib.blake2b(digest_size=8)
+    for path in store_files(filename):
+        stat = os.stat(path)
+        digest.update(f"{path}\x1f{stat.st_size}\x1f{stat.st_mtime_ns}\x1e".encode('utf-8'))
+    return digest.hexdigest()
+
+
+def load_fingerprints(filename):
+    """
+    读取指纹索引 {uploadInfoDetailId: 指纹}
+    索引表头记录了写入时的存储签名，索引不存在或与存储的当前状态不一致时
+    （例如首次升级、在新的检出目录中运行、git pull 带来了其他地方提交的数据、数据文件被删除），从存储的当前状态重建索引
+    """
+    path = fingerprint_path(filename)
+    fingerprints = {}
+
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            reader = csv.reader(f)
+            header = next(reader, None)
+            if header and header[2:] == [store_signature(filename)]:
+                for row in reader:
+                    if len(row) >= 2:
+                        fingerprints[row[0]] = row[1]
+                return fingerprints
+        print(f"指纹索引与 {filename} 的当前状态不一致，重新建立索引...")
+
+    records = load_store_records(filename)
+    if records:
+        print(f"从 {filename} 重建指纹索引...")
+        for id_, record in records.items():
+            if id_:
+                fingerprints[id_] = record_fingerprint(record)
+        write_fingerprints(filename, fingerprints)
+
+    return fingerprints
+
+
+def write_fingerprints(filename, fingerprints):
+    """
+    写入指纹索引，按 uploadInfoDetailId 排序以便版本管理时产生稳定的差异
+    表头带有存储的当前签名，需要在数据写入完成后调用
+    """
+    path = fingerprint_path(filename)
+    with atomic_write(path) as f:
+        writer = csv.writer(f)
+        writer.writerow(['uploadInfoDetailId', 'fingerprint', store_signature(filename)])
+        for id_ in sorted(fingerprints, key=lambda x: (len(x), x)):
+            writer.writerow([id_, fingerprints[id_]])
+
+
+def diff_records(incoming, fingerprints):
+    """
+    将一批记录与指纹索引比较
+    :param incoming: {uploadInfoDetailId: 记录}
+    :param fingerprints: 已有的指纹索引
+    :return: (新增 ID 集合, 变更 ID 集合, {ID: 新指纹})
+    """
+    new_ids = set()
+    changed_ids = set()
+    incoming_fingerprints = {}
+
+    for id_, record in incoming.items():
+        fingerprint = record_fingerprint(record)
+        incoming_fingerprints[id_] = fingerprint
+        stored = fingerprints.get(id_)
+        if stored is None:
+            new_ids.add(id_)
+        elif stored != fingerprint:
+            changed_ids.add(id_)
+
+    return new_ids, changed_ids, incoming_fingerprints
+
+
+def field_changes(old_record, new_record, detected_at, commit_seq=''):
+    """
+    生成字段级变更记录，只比较新记录中出现的字段
+    :return: 变更记录列表，每项包含 CHANGE_LOG_FIELDS 中的字段
+    """
+    changes = []
+    for field in sorted(new_record):
+        if field in FINGERPRINT_IGNORED_FIELDS:
+            continue
+        old_value = _normalize(old_record.get(field))
+        new_value = _normalize(new_record.get(field))
+        if old_value != new_value:
+            changes.append({
+                'detected_at': detected_at,
+                'uploadInfoDetailId': str(new_record.get('uploadInfoDetailId', '')),
+                'fundCode': new_record.get('fundCode', '') or old_record.get('fundCode', ''),
+                'field': field,
+                'old_value': old_value,
+                'new_value': new_value,
+                'commit_seq': commit_seq,
+            })
+    return changes
+
+
+def append_change_log(changes, filename=CHANGES_FILE):
+    """追加字段级变更记录到变更日志"""
+    if not changes:
+        return
+
+    write_header = not os.path.exists(filename)
+    if not write_header:
+        with open(filename, 'r', encoding='utf-8') as f:
+            header = next(csv.reader(f), None)
+        if header != CHANGE_LOG_FIELDS:
+            # 旧版本的变更日志缺少新增的列（例如 commit_seq），补齐列后重写
+            with open(filename, 'r', encoding='utf-8') as f:
+                rows = list(csv.DictReader(f))
+            with atomic_write(filename) as f:
+                writer = csv.DictWriter(f, fieldnames=CHANGE_LOG_FIELDS, extrasaction='ignore')
+                writer.writeheader()
+                writer.writerows(rows)
+    with open(filename, 'a', encoding='utf-8', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=CHANGE_LOG_FIELDS)
+        if write_header:
+            writer.writeheader()
+        writer.writerows(changes)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def read_records(filename):
+    """读取数据文件 {uploadInfoDetailId: 记录}"""
+    records = {}
+    if os.path.exists(filename):
+        with open(filename, 'r', encoding='utf-8') as f:
+            reader = csv.reader(f)
+            header = next(reader, None)
+            # 使用 uploadInfoDetailId 作为主键，如果不存在则跳过
+            if not header or 'uploadInfoDetailId' not in header:
+                return records
+            id_index = header.index('uploadInfoDetailId')
+            load = row_loader(header)
+            for row in reader:
+                if len(row) > id_index:
+                    records[row[id_index]] = load(row)
+    return records
+
+
+def load_store_records(filename):
+    """读取存储的当前状态：full 模式读取数据文件，delta 模式合并基线数据文件、年度快照和增量文件"""
+    if EXPORT_MODE == 'delta':
+        from delta_store import load_state
+        return load_state(filename)
+    return read_records(filename)
+
+
+def write_records(filename, records):
+    """
+    按 uploadInfoDetailId 排序后原子写入数据文件
+    :param records: {uploadInfoDetailId: FundRecord}
+    """
+    all_data = sorted(records.values(), key=lambda x: int(x['uploadInfoDetailId']))
+
+    # 固定字段加上少数记录带有的额外字段，不需要逐行收集全部字段
+    all_fields = set(FUND_FIELDS) | extra_fields(all_data)
+    other_fields = sorted([f for f in all_fields if f not in CORE_FIELDS])
+
+    with atomic_write(filename) as f:
+        writer = csv.DictWriter(f, fieldnames=CORE_FIELDS + other_fields)
+        writer.writeheader()
+        writer.writerows(all_data)
+    return len(all_data)
+
+
+def commit_batch(incoming, filename, detected_at):
+    """
+    把一批记录合并到数据文件，调用方需要持有 store_lock
+    先只与指纹索引比较，有新增或变更时才读取并重写数据文件
+    新增和变更的记录以及字段级变更明细带有本次的提交序号 commit_seq（持有锁时分配，严格递增），
+    只读接口的变更流以它为游标，不受各进程获取时间先后的影响
+    :param incoming: {uploadInfoDetailId: 记录}，记录可以是 FundRecord 或字典
+    :param detected_at: 本批数据的获取时间
+    :return: (新增记录列表, 确有字段变更的记录列表, 字段级变更明细列表)
+    """
+    incoming = {id_: record if isinstance(record, FundRecord) else FundRecord.from_dict(record)
+                for id_, record in incoming.items()}
+    fingerprints = load_fingerprints(filename)
+    new_ids, changed_ids, incoming_fingerprints = diff_records(incoming, fingerprints)
+
+    if not new_ids and not changed_ids:
+        print("没有新的数据需要保存")
+        return [], [], []
+
+    print(f"发现 {len(new_ids)} 条新数据，{len(changed_ids)} 条可能变更的数据")
+    existing = load_store_records(filename)
+    commit_seq = str(max((int(record.get('commit_seq') or 0) for record in existing.values()), default=0) + 1)
+
+    # 生成字段级变更记录，没有实际字段差异的（例如仅缺少部分字段）视为未变化
+    changes = []
+    changed_records = []
+    for id_ in sorted(changed_ids):
+        old_row = existing.get(id_) or FundRecord()
+        record_changes = field_changes(old_row, incoming[id_], detected_at, commit_seq)
+        if record_changes:
+            changes.extend(record_changes)
+            merged_row = old_row.copy()
+            merged_row.update(incoming[id_])
+            merged_row['commit_seq'] = commit_seq
+            existing[id_] = merged_row
+            changed_records.append(merged_row)
+
+    new_records = [incoming[id_] for id_ in new_ids]
+    for record in new_records:
+        record['commit_seq'] = commit_seq
+        existing[str(record['uploadInfoDetailId'])] = record
+
+    if new_records or changed_records:
+        if EXPORT_MODE == 'delta':
+            from delta_store import write_delta, store_dirs
+            saved_to = write_delta(new_records + changed_records, detected_at[:10], store_dirs(filename)[0])
+            total = len(existing)
+        else:
+            saved_to = filename
+            total = write_records(filename, existing)
+        print(f"数据已保存到 {saved_to}")
+        print(f"新增记录: {len(new_records)} 条")
+        print(f"变更记录: {len(changed_records)} 条（{len(changes)} 个字段）")
+        print(f"总记录数: {total} 条")
+    else:
+        print("没有实际的字段变更，仅更新指纹索引")
+
+    # 更新指纹索引（包括没有实际字段差异的记录，避免下次重复比较）
+    for id_ in new_ids | changed_ids:
+        fingerprints[id_] = incoming_fingerprints[id_]
+    write_fingerprints(filename, fingerprints)
+    append_change_log(changes, change_log_path(filename))
+
+    return new_records, changed_records, changes
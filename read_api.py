@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+本地只读 HTTP 接口，供下游读取基金数据
+数据从内存索引返回，只有数据文件发生变化时才重新加载；
+ETag 由存储版本和查询参数决定，未变化时直接返回 304，不需要执行查询
+
+接口:
+  GET /funds?organName=南方&fundCode=0209&q=日本&after=1440955&limit=50
+      organName 和 fundCode 前缀匹配（organName=南方 匹配 南方基金管理有限公司），q 匹配 fundShortName/reportName，
+      按 uploadInfoDetailId 升序分页，响应中的 next_cursor 作为下一页的 after 参数
+  GET /funds/changes?after=42:1440955&limit=50
+      按提交序号返回 after 之后新增或变更的记录以及对应的字段级变更明细，不带 after 时从头开始；
+      响应中的 next_cursor 作为下一次的 after 参数，has_more 为 true 时还有下一页
+
+用法:
+  python read_api.py --port 8080
+"""
+
+import os
+import sys
+import csv
+import json
+import bisect
+import hashlib
+import argparse
+import threading
+import urllib.parse
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from fund_store import load_store_records, fingerprint_path, change_log_path, store_lock, CHANGE_LOG_FIELDS
+
+
+DEFAULT_DATA_FILE = 'data/csrc_fund_data.csv'
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+def _sort_key(id_):
+    """uploadInfoDetailId 按数值排序，非数字的编号排在最后"""
+    return (0, int(id_), '') if id_.isdigit() else (1, 0, id_)
+
+
+def _commit_key(item):
+    """变更流的排序键：(提交序号, uploadInfoDetailId)，没有提交序号的旧数据视为 0"""
+    seq = item.get('commit_seq')
+    return int(seq) if seq else 0, _sort_key(str(item['uploadInfoDetailId']))
+
+
+def _parse_cursor(cursor):
+    """解析变更流游标 '提交序号:uploadInfoDetailId'，只有提交序号时表示该次提交之后"""
+    seq, _, id_ = cursor.partition(':')
+    try:
+        seq = int(seq)
+    except ValueError:
+        raise ValueError(f"无效的游标: {cursor}") from None
+    return seq, _sort_key(id_) if id_ else (2, 0, '')
+
+
+def _stat_version(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return '0'
+    return f"{stat.st_mtime_ns:x}.{stat.st_size:x}"
+
+
+class FundIndex:
+    """数据文件的内存索引，数据文件或变更日志变化时自动重新加载"""
+
+    def __init__(self, filename=DEFAULT_DATA_FILE, changes_file=None):
+        self.filename = filename
+        self.changes_file = changes_file or change_log_path(filename)
+        self.lock = threading.Lock()
+        self.version = None
+        self.records = []
+        self.ids = []
+        self.by_commit = []
+        self.commit_keys = []
+        self.changes = []
+        self.change_keys = []
+
+    def current_version(self):
+        """
+        存储版本：数据文件、指纹索引和变更日志的修改时间与大小
+        增量导出模式下数据文件不再改写，但每次保存新数据都会更新指纹索引
+        """
+        return '-'.join(_stat_version(path) for path in
+                        (self.filename, fingerprint_path(self.filename), self.changes_file))
+
+    def refresh(self):
+        """
+        版本变化时重新加载，返回当前版本
+        加载时持有数据文件锁，读到的记录和变更日志来自同一次提交之后的状态
+        """
+        version = self.current_version()
+        if version == self.version:
+            return version
+        with self.lock:
+            if version != self.version:
+                with store_lock(self.filename):
+                    version = self.current_version()
+                    self._load()
+                self.version = version
+        return version
+
+    def _load(self):
+        records = list(load_store_records(self.filename).values())
+        records.sort(key=lambda record: _sort_key(str(record['uploadInfoDetailId'])))
+        by_commit = sorted(records, key=_commit_key)
+
+        changes = []
+        if os.path.exists(self.changes_file):
+            with open(self.changes_file, 'r', encoding='utf-8') as f:
+                changes = [{field: row.get(field, '') for field in CHANGE_LOG_FIELDS} for row in csv.DictReader(f)]
+            changes.sort(key=_commit_key)
+
+        # 一次性替换，查询线程始终看到完整的一个版本
+        self.records = records
+        self.ids = [_sort_key(str(record['uploadInfoDetailId'])) for record in records]
+        self.by_commit = by_commit
+        self.commit_keys = [_commit_key(record) for record in by_commit]
+        self.changes = changes
+        self.change_keys = [_commit_key(change) for change in changes]
+        print(f"读取接口已加载 {len(records)} 条记录，{len(changes)} 条变更明细")
+
+    def query(self, organ_name=None, fund_code=None, keyword=None, after=None, limit=DEFAULT_PAGE_SIZE):
+        """按条件过滤并按 uploadInfoDetailId 游标分页，返回 (记录列表, 下一页游标)"""
+        records, ids = self.records, self.ids
+        start = bisect.bisect_right(ids, _sort_key(after)) if after else 0
+
+        items = []
+        next_cursor = None
+        for record in records[start:]:
+            if organ_name and not str(record.get('organName') or '').startswith(organ_name):
+                continue
+            if fund_code and not str(record.get('fundCode') or '').startswith(fund_code):
+                continue
+            if keyword and keyword not in (record.get('fundShortName') or '') \
+                    and keyword not in (record.get('reportName') or ''):
+                continue
+            if len(items) == limit:
+                next_cursor = str(items[-1]['uploadInfoDetailId'])
+                break
+            items.append(record)
+        return items, next_cursor
+
+    def changes_since(self, after=None, limit=DEFAULT_PAGE_SIZE):
+        """
+        按 (提交序号, uploadInfoDetailId) 游标分页返回 after 之后新增或变更的记录以及对应的字段级变更明细
+        提交序号在写入时持有锁分配，晚提交的记录一定排在已返回的游标之后
+        :return: (记录列表, 变更明细列表, 下一次请求的游标, 是否还有下一页)
+        """
+        by_commit, commit_keys = self.by_commit, self.commit_keys
+        changes, change_keys = self.changes, self.change_keys
+
+        after_key = _parse_cursor(after) if after else None
+        start = bisect.bisect_right(commit_keys, after_key) if after else 0
+        records = by_commit[start:start + limit]
+        has_more = start + limit < len(by_commit)
+
+        # 变更明细与记录使用同样的排序键，取出落在本页记录范围内的明细
+        change_start = bisect.bisect_right(change_keys, after_key) if after else 0
+        change_end = bisect.bisect_right(change_keys, commit_keys[start + limit - 1]) if has_more else len(changes)
+        field_changes = changes[change_start:change_end]
+
+        next_cursor = after
+        last = max(records[-1:] + field_changes[-1:], key=_commit_key, default=None)
+        if last is not None:
+            next_cursor = f"{_commit_key(last)[0]}:{last['uploadInfoDetailId']}"
+        return records, field_changes, next_cursor, has_more
+
+
+class ReadAPIHandler(BaseHTTPRequestHandler):
+    """只读接口的请求处理"""
+
+    index = None
+
+    def log_message(self, format, *args):
+        # 定时任务模式下避免每个请求都输出日志
+        pass
+
+    def _send_json(self, status, payload, etag=None):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        if etag:
+            self.send_header('ETag', etag)
+            self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urllib.parse.urlsplit(self.path)
+        if url.path not in ('/funds', '/funds/changes'):
+            self._send_json(404, {'error': 'not found'})
+            return
+
+        params = {key: values[-1] for key, values in urllib.parse.parse_qs(url.query).items()}
+        version = self.index.refresh()
+
+        # 强 ETag：存储版本 + 规范化后的查询参数，未变化时直接返回 304
+        normalized = urllib.parse.urlencode(sorted(params.items()))
+        etag = '"' + hashlib.sha1(f"{version}|{url.path}?{normalized}".encode('utf-8')).hexdigest() + '"'
+        if etag in [tag.strip() for tag in self.headers.get('If-None-Match', '').split(',')]:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+
+        try:
+            limit = min(MAX_PAGE_SIZE, max(1, int(params.get('limit', DEFAULT_PAGE_SIZE))))
+            if url.path == '/funds':
+                items, next_cursor = self.index.query(params.get('organName'), params.get('fundCode'),
+                                                      params.get('q'), params.get('after'), limit)
+                payload = {'items': [item.to_dict() for item in items], 'next_cursor': next_cursor}
+            else:
+                records, field_changes, next_cursor, has_more = self.index.changes_since(params.get('after'), limit)
+                payload = {'after': params.get('after'), 'next_cursor': next_cursor, 'has_more': has_more,
+                           'records': [record.to_dict() for record in records], 'changes': field_changes}
+        except ValueError as e:
+            self._send_json(400, {'error': str(e)})
+            return
+
+        self._send_json(200, payload, etag)
+
+
+def start_read_api(host='127.0.0.1', port=8080, filename=DEFAULT_DATA_FILE):
+    """在后台线程启动只读接口，返回 HTTP 服务对象"""
+    index = FundIndex(filename)
+    index.refresh()
+    handler = type('BoundReadAPIHandler', (ReadAPIHandler,), {'index': index})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='read-api', daemon=True).start()
+    print(f"🌐 读取接口已启动: http://{host}:{port}/funds")
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description='基金数据只读 HTTP 接口')
+    parser.add_argument('--host', default='127.0.0.1', help='监听地址，默认127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080, help='监听端口，默认8080')
+    parser.add_argument('--data-file', default=DEFAULT_DATA_FILE, help='数据文件路径')
+    args = parser.parse_args()
+
+    server = start_read_api(args.host, args.port, args.data_file)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        print("\n⏹️  收到停止信号，关闭读取接口")
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+"""
+CSRC 数据获取的弹性策略，urllib 和浏览器两种获取方式共用
+- 自适应超时：根据最近成功请求耗时的分位数设置超时
+- 重试：只对可重试的错误（超时、连接错误、429/5xx）使用带抖动的指数退避重试，所有重试共享一个总时限
+- 熔断：连续失败达到阈值后在冷却期内直接跳过该获取方式
+- 全局限速：令牌桶限制对 CSRC 的请求频率，可通过状态文件在多个进程之间共享
+
+耗时样本和熔断状态保存在状态文件中（RESILIENCE_STATE_FILE），单次运行的命令行和 GitHub Actions
+也能利用之前运行积累的耗时统计和失败次数；设置为空字符串时只保存在进程内存中
+"""
+
+import os
+import copy
+import json
+import time
+import random
+import socket
+import tempfile
+import threading
+import urllib.error
+
+from fund_store import store_lock, atomic_write
+
+
+RETRYABLE_HTTP_CODES = {408, 425, 429, 500, 502, 503, 504}
+# 可以重试的网络错误：超时和连接被重置/拒绝/中断；证书校验失败、域名解析失败、权限错误等其他 OSError 重试也不会成功
+RETRYABLE_ERRORS = (socket.timeout, TimeoutError, ConnectionResetError, ConnectionRefusedError, ConnectionAbortedError)
+
+# 各获取方式的默认策略，超时单位为秒；deadline 为包括重试和退避在内的总时限
+POLICY_DEFAULTS = {
+    'urllib': {'default_timeout': 60, 'min_timeout': 10, 'max_timeout': 60, 'retries': 3, 'deadline': 90},
+    'browser': {'default_timeout': 120, 'min_timeout': 30, 'max_timeout': 180, 'retries': 1, 'deadline': 240},
+}
+# 浏览器内部各阶段的自适应等待时间
+LATENCY_DEFAULTS = {
+    'browser_page': {'default_timeout': 20, 'min_timeout': 5, 'max_timeout': 60},
+    'browser_xhr': {'default_timeout': 60, 'min_timeout': 10, 'max_timeout': 120},
+}
+
+CIRCUIT_FAILURE_THRESHOLD = int(os.environ.get('CIRCUIT_FAILURE_THRESHOLD', '3'))
+CIRCUIT_COOLDOWN_SECONDS = float(os.environ.get('CIRCUIT_COOLDOWN_SECONDS', '600'))
+RATE_LIMIT_PER_SECOND = float(os.environ.get('CSRC_RATE_LIMIT_PER_SECOND', '1.0'))
+RATE_LIMIT_BURST = float(os.environ.get('CSRC_RATE_LIMIT_BURST', '4'))
+RATE_LIMIT_STATE_FILE = os.environ.get(
+    'CSRC_RATE_LIMIT_STATE_FILE', os.path.join(tempfile.gettempdir(), 'qdii-new-fund-notify-rate.json'))
+RESILIENCE_STATE_FILE = os.environ.get(
+    'RESILIENCE_STATE_FILE', os.path.join(tempfile.gettempdir(), 'qdii-new-fund-notify-resilience.json'))
+
+
+class CircuitOpenError(Exception):
+    """熔断器处于打开状态，本次调用被跳过"""
+
+
+class FetchCancelled(Exception):
+    """获取被主动取消（例如对冲获取中另一方已经成功），既不计为成功也不计为失败"""
+
+
+def is_retryable(error):
+    """判断错误是否值得重试：超时、连接错误和服务端临时错误可以重试，其余错误直接失败"""
+    if isinstance(error, urllib.error.HTTPError):
+        return error.code in RETRYABLE_HTTP_CODES
+    if isinstance(error, urllib.error.URLError):
+        return isinstance(error.reason, RETRYABLE_ERRORS)
+    if isinstance(error, RETRYABLE_ERRORS):
+        return True
+    # selenium 的超时异常（避免在这里导入 selenium）
+    return type(error).__name__ == 'TimeoutException'
+
+
+class PolicyState:
+    """
+    耗时样本和熔断状态的存储
+    指定 state_file 时保存在文件中并由文件锁保护（多个进程以及多次运行之间共享），否则保存在内存中
+    """
+
+    def __init__(self, state_file=None):
+        self.state_file = state_file
+        self.data = {}
+        self.lock = threading.Lock()
+
+    def _read_file(self):
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    def get(self, section, key, default=None):
+        """读取 section 下 key 对应的状态（返回副本）"""
+        if self.state_file:
+            data = self._read_file()
+        else:
+            with self.lock:
+                data = copy.deepcopy(self.data)
+        return data.get(section, {}).get(key, default)
+
+    def update(self, func):
+        """在锁内以完整状态字典调用 func 并保存修改，返回 func 的返回值"""
+        if not self.state_file:
+            with self.lock:
+                return func(self.data)
+
+        with store_lock(self.state_file):
+            data = self._read_file()
+            result = func(data)
+            with atomic_write(self.state_file) as f:
+                json.dump(data, f)
+            return result
+
+
+class LatencyTracker:
+    """记录最近成功请求的耗时，按分位数计算自适应超时"""
+
+    def __init__(self, default_timeout, min_timeout, max_timeout,
+                 window=50, percentile=0.95, multiplier=2.0, min_samples=5, store=None, key='default'):
+        self.default_timeout = default_timeout
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.window = window
+        self.percentile = percentile
+        self.multiplier = multiplier
+        self.min_samples = min_samples
+        self.store = store or PolicyState()
+        self.key = key
+
+    def record(self, seconds):
+        def append(data):
+            samples = data.setdefault('latency', {}).setdefault(self.key, [])
+            samples.append(round(seconds, 3))
+            del samples[:-self.window]
+
+        self.store.update(append)
+
+    def timeout(self):
+        """样本不足时使用默认超时，否则为分位数耗时乘以系数，并限制在上下限之间"""
+        samples = self.store.get('latency', self.key, [])
+        if len(samples) < self.min_samples:
+            return self.default_timeout
+        ordered = sorted(samples)
+        value = ordered[min(len(ordered) - 1, int(len(ordered) * self.percentile))]
+        return max(self.min_timeout, min(self.max_timeout, value * self.multiplier))
+
+
+class CircuitBreaker:
+    """
+    熔断器：连续失败达到阈值后打开，冷却期结束后放行一次试探调用（半开）
+    打开时间使用系统时间记录，状态保存在文件中时多个进程和多次运行看到同一个熔断器
+    """
+
+    def __init__(self, failure_threshold=CIRCUIT_FAILURE_THRESHOLD, cooldown=CIRCUIT_COOLDOWN_SECONDS,
+                 store=None, key='default'):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.store = store or PolicyState()
+        self.key = key
+
+    def _opened_at(self):
+        return self.store.get('breakers', self.key, {}).get('opened_at')
+
+    @property
+    def failures(self):
+        return self.store.get('breakers', self.key, {}).get('failures', 0)
+
+    @property
+    def state(self):
+        opened_at = self._opened_at()
+        if opened_at is None:
+            return 'closed'
+        if time.time() - opened_at >= self.cooldown:
+            return 'half_open'
+        return 'open'
+
+    def allow(self):
+        return self.state != 'open'
+
+    def remaining_cooldown(self):
+        opened_at = self._opened_at()
+        if opened_at is None:
+            return 0
+        return max(0.0, self.cooldown - (time.time() - opened_at))
+
+    def record_success(self):
+        self.store.update(lambda data: data.setdefault('breakers', {}).pop(self.key, None))
+
+    def record_failure(self):
+        def fail(data):
+            breaker = data.setdefault('breakers', {}).setdefault(self.key, {'failures': 0, 'opened_at': None})
+            breaker['failures'] += 1
+            # 半开状态下试探失败，或连续失败达到阈值，重新开始冷却
+            if breaker['opened_at'] is not None or breaker['failures'] >= self.failure_threshold:
+                breaker['opened_at'] = time.time()
+
+        self.store.update(fail)
+
+
+class TokenBucket:
+    """
+    令牌桶限速
+    指定 state_file 时令牌状态保存在文件中并由文件锁保护，同一台机器上的多个进程共享同一个限额
+    """
+
+    def __init__(self, rate, capacity, state_file=None):
+        self.rate = rate
+        self.capacity = capacity
+        self.state_file = state_file
+        self.tokens = capacity
+        self.updated = time.time()
+        self.lock = threading.Lock()
+
+    def _take(self):
+        """尝试取出一个令牌，成功返回 0，否则返回需要等待的秒数"""
+        if self.state_file:
+            with store_lock(self.state_file):
+                try:
+                    with open(self.state_file, 'r', encoding='utf-8') as f:
+                        state = json.load(f)
+                    tokens, updated = state['tokens'], state['updated']
+                except (OSError, ValueError, KeyError):
+                    tokens, updated = self.capacity, time.time()
+                wait, tokens, updated = self._refill_and_take(tokens, updated)
+                with open(self.state_file, 'w', encoding='utf-8') as f:
+                    json.dump({'tokens': tokens, 'updated': updated}, f)
+                return wait
+
+        with self.lock:
+            wait, self.tokens, self.updated = self._refill_and_take(self.tokens, self.updated)
+            return wait
+
+    def _refill_and_take(self, tokens, updated):
+        now = time.time()
+        tokens = min(self.capacity, tokens + max(0.0, now - updated) * self.rate)
+        if tokens >= 1:
+            return 0, tokens - 1, now
+        return (1 - tokens) / self.rate, tokens, now
+
+    def acquire(self, count=1):
+        """阻塞直到取得 count 个令牌"""
+        if self.rate <= 0:
+            return
+        for _ in range(count):
+            while True:
+                wait = self._take()
+                if not wait:
+                    break
+                time.sleep(wait)
+
+
+class ResiliencePolicy:
+    """一种获取方式的弹性策略：自适应超时 + 可重试错误的抖动退避重试（受总时限约束）+ 熔断"""
+
+    def __init__(self, name, default_timeout, min_timeout, max_timeout, retries, deadline,
+                 base_delay=1.0, max_delay=30.0, store=None):
+        self.name = name
+        self.retries = retries
+        self.deadline = deadline
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.latency = LatencyTracker(default_timeout, min_timeout, max_timeout, store=store, key=name)
+        self.breaker = CircuitBreaker(store=store, key=name)
+        self.local = threading.local()
+
+    def timeout(self):
+        """当前的自适应超时（秒），在 call() 内调用时不超过总时限的剩余时间"""
+        timeout = self.latency.timeout()
+        deadline = getattr(self.local, 'deadline', None)
+        if deadline is not None:
+            timeout = max(1.0, min(timeout, deadline - time.monotonic()))
+        return timeout
+
+    def call(self, func, cancel=None):
+        """
+        按策略执行 func()，func 内部应使用 policy.timeout() 作为超时
+        剩余时间不足以再做一次最短超时的尝试时不再重试
+        :param cancel: 可选的 threading.Event，设置后不再发起新的尝试，退避等待也会立即结束
+        :raises CircuitOpenError: 熔断器打开时直接跳过
+        :raises FetchCancelled: 调用被取消（func 也可以抛出该异常），不记录耗时样本，也不改变熔断状态
+        """
+        if not self.breaker.allow():
+            raise CircuitOpenError(
+                f"{self.name} 方式已熔断，{self.breaker.remaining_cooldown():.0f} 秒后再尝试")
+
+        deadline = time.monotonic() + self.deadline
+        self.local.deadline = deadline
+        try:
+            for attempt in range(1, self.retries + 1):
+                if cancel is not None and cancel.is_set():
+                    raise FetchCancelled(f"{self.name} 获取已取消")
+                start = time.monotonic()
+                try:
+                    result = func()
+                except FetchCancelled:
+                    raise
+                except Exception as e:
+                    # 全抖动指数退避
+                    delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+                    out_of_time = time.monotonic() + delay + self.latency.min_timeout > deadline
+                    if attempt >= self.retries or out_of_time or not is_retryable(e):
+                        self.breaker.record_failure()
+                        raise
+                    print(f"{self.name} 请求失败（第 {attempt}/{self.retries} 次）: {e}，{delay:.1f} 秒后重试")
+                    if cancel is not None:
+                        cancel.wait(delay)
+                    else:
+                        time.sleep(delay)
+                    continue
+
+                self.latency.record(time.monotonic() - start)
+                self.breaker.record_success()
+                return result
+        finally:
+            self.local.deadline = None
+
+
+_policies = {}
+_latency_trackers = {}
+_registry_lock = threading.Lock()
+
+# 所有策略共享的耗时样本和熔断状态
+policy_state = PolicyState(RESILIENCE_STATE_FILE or None)
+
+# 全局令牌桶，所有获取方式共享
+rate_limiter = TokenBucket(RATE_LIMIT_PER_SECOND, RATE_LIMIT_BURST, RATE_LIMIT_STATE_FILE)
+
+
+def get_policy(name):
+    """获取指定获取方式的弹性策略（熔断和耗时统计保存在 RESILIENCE_STATE_FILE 中，多个进程和多次运行共享）"""
+    with _registry_lock:
+        if name not in _policies:
+            defaults = POLICY_DEFAULTS[name]
+            retries = int(os.environ.get(f'{name.upper()}_FETCH_RETRIES', defaults['retries']))
+            deadline = float(os.environ.get(f'{name.upper()}_FETCH_DEADLINE', defaults['deadline']))
+            _policies[name] = ResiliencePolicy(name, defaults['default_timeout'], defaults['min_timeout'],
+                                               defaults['max_timeout'], retries, deadline, store=policy_state)
+        return _policies[name]
+
+
+def get_latency_tracker(name):
+    """获取浏览器内部阶段的耗时统计"""
+    with _registry_lock:
+        if name not in _latency_trackers:
+            _latency_trackers[name] = LatencyTracker(**LATENCY_DEFAULTS[name], store=policy_state, key=name)
+        return _latency_trackers[name]
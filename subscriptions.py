@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+基金订阅匹配模块
+把所有用户的订阅规则编译成共享结构（关键词 Aho-Corasick 自动机、基金公司前缀和基金代码前缀哈希表），
+每批新数据只需单次扫描即可生成每个收件人的摘要，单条记录的匹配成本与订阅人数无关
+
+订阅文件为 JSON 列表，例如:
+[
+    {"email": "a@example.com", "keywords": ["纳斯达克", "日本"], "companies": ["南方"]},
+    {"email": "b@example.com", "fund_code_prefixes": ["0209"]},
+    {"email": "c@example.com"}
+]
+companies 匹配 organName 前缀，"南方" 可以匹配 "南方基金管理有限公司"，也可以填写完整的机构名称
+同一类规则内任意一条命中即可（或），不同类规则需同时命中（与），没有任何规则的订阅接收全部数据
+"""
+
+import os
+import json
+from collections import deque
+
+
+SUBSCRIPTIONS_FILE = os.environ.get('SUBSCRIPTIONS_FILE', 'subscriptions.json')
+
+# 关键词匹配的字段，以及各类规则对应的位掩码
+KEYWORD_FIELDS = ('fundShortName', 'reportName')
+RULE_KEYWORD = 1
+RULE_COMPANY = 2
+RULE_CODE_PREFIX = 4
+
+
+class AhoCorasick:
+    """多模式字符串匹配自动机，一次扫描找出文本中出现的全部关键词"""
+
+    def __init__(self, patterns):
+        """
+        :param patterns: 关键词列表，关键词在列表中的下标即为匹配结果中的编号
+        """
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [()]
+
+        for index, pattern in enumerate(patterns):
+            if not pattern:
+                continue
+            state = 0
+            for char in pattern.lower():
+                next_state = self.goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self.goto)
+                    self.goto[state][char] = next_state
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append(())
+                state = next_state
+            self.output[state] = self.output[state] + (index,)
+
+        # 广度优先构建失败指针，并把失败链上的输出合并到当前状态
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self.goto[state].items():
+                queue.append(next_state)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[next_state] = self.goto[fallback].get(char, 0)
+                self.output[next_state] = self.output[next_state] + self.output[self.fail[next_state]]
+
+    def search(self, text):
+        """返回文本中出现的关键词编号集合"""
+        found = set()
+        goto = self.goto
+        fail = self.fail
+        output = self.output
+        state = 0
+        for char in text.lower():
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                found.update(output[state])
+        return found
+
+
+class SubscriptionMatcher:
+    """编译后的订阅规则集合"""
+
+    def __init__(self, subscriptions):
+        """
+        :param subscriptions: 订阅列表，每项包含 email 以及可选的 keywords、companies、fund_code_prefixes
+        """
+        self.recipients = []
+        self.required_masks = []
+        self.catch_all = []
+        self.company_index = {}
+        self.max_company_length = 0
+        self.prefix_index = {}
+        self.max_prefix_length = 0
+
+        keyword_ids = {}
+        keyword_subscribers = []
+
+        for subscription in subscriptions:
+            email = (subscription.get('email') or '').strip()
+            if not email:
+                print(f"警告: 订阅缺少 email 字段，已跳过: {subscription}")
+                continue
+
+            sub_id = len(self.recipients)
+            self.recipients.append(email)
+            mask = 0
+
+            for keyword in subscription.get('keywords') or []:
+                keyword = keyword.strip().lower()
+                if not keyword:
+                    continue
+                if keyword not in keyword_ids:
+                    keyword_ids[keyword] = len(keyword_subscribers)
+                    keyword_subscribers.append([])
+                keyword_subscribers[keyword_ids[keyword]].append(sub_id)
+                mask |= RULE_KEYWORD
+
+            for company in subscription.get('companies') or []:
+                company = company.strip()
+                if company:
+                    self.company_index.setdefault(company, []).append(sub_id)
+                    self.max_company_length = max(self.max_company_length, len(company))
+                    mask |= RULE_COMPANY
+
+            for prefix in subscription.get('fund_code_prefixes') or []:
+                prefix = str(prefix).strip()
+                if prefix:
+                    self.prefix_index.setdefault(prefix, []).append(sub_id)
+                    self.max_prefix_length = max(self.max_prefix_length, len(prefix))
+                    mask |= RULE_CODE_PREFIX
+
+            self.required_masks.append(mask)
+            if not mask:
+                self.catch_all.append(sub_id)
+
+        self.keyword_subscribers = keyword_subscribers
+        self.automaton = AhoCorasick(list(keyword_ids))
+
+    @classmethod
+    def from_file(cls, path=SUBSCRIPTIONS_FILE):
+        """从 JSON 文件加载并编译订阅规则"""
+        with open(path, 'r', encoding='utf-8') as f:
+            subscriptions = json.load(f)
+        if not isinstance(subscriptions, list):
+            raise ValueError(f"订阅文件格式错误，应为列表: {path}")
+        return cls(subscriptions)
+
+    def match_record(self, record):
+        """返回匹配该记录的订阅编号列表"""
+        hit_masks = {}
+
+        if self.keyword_subscribers:
+            # 字段之间用换行分隔，避免关键词跨字段误匹配
+            text = '\n'.join(str(record.get(field) or '') for field in KEYWORD_FIELDS)
+            for keyword_id in self.automaton.search(text):
+                for sub_id in self.keyword_subscribers[keyword_id]:
+                    hit_masks[sub_id] = hit_masks.get(sub_id, 0) | RULE_KEYWORD
+
+        organ_name = str(record.get('organName') or '').strip()
+        for length in range(1, min(len(organ_name), self.max_company_length) + 1):
+            for sub_id in self.company_index.get(organ_name[:length], ()):
+                hit_masks[sub_id] = hit_masks.get(sub_id, 0) | RULE_COMPANY
+
+        fund_code = str(record.get('fundCode') or '').strip()
+        for length in range(1, min(len(fund_code), self.max_prefix_length) + 1):
+            for sub_id in self.prefix_index.get(fund_code[:length], ()):
+                hit_masks[sub_id] = hit_masks.get(sub_id, 0) | RULE_CODE_PREFIX
+
+        required = self.required_masks
+        matched = [sub_id for sub_id, mask in hit_masks.items() if mask == required[sub_id]]
+        matched.extend(self.catch_all)
+        return matched
+
+    def match_batch(self, records):
+        """
+        单次扫描一批记录，生成每个收件人的摘要
+        :return: {收件人邮箱: [记录, ...]}，记录保持输入顺序且每个收件人不重复
+        """
+        digests = {}
+        for record in records:
+            for email in {self.recipients[sub_id] for sub_id in self.match_record(record)}:
+                digests.setdefault(email, []).append(record)
+        return digests
+
+
+_matcher_cache = {}
+
+
+def load_subscription_matcher(path=SUBSCRIPTIONS_FILE):
+    """
+    加载编译后的订阅规则，文件不存在时返回 None
+    按文件修改时间缓存，定时任务模式下文件未变化时不会重复编译
+    """
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+    cached = _matcher_cache.get(path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+
+    matcher = SubscriptionMatcher.from_file(path)
+    _matcher_cache[path] = (mtime, matcher)
+    print(f"已加载 {len(matcher.recipients)} 条订阅规则: {path}")
+    return matcher
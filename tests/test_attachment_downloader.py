@@ -0,0 +1,144 @@
+import hashlib
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from attachment_downloader import AttachmentDownloader
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """本地替身服务：/<名称> 返回 files 中的内容，支持 Range、If-Range 和 416"""
+
+    files = {}
+    requests = []
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        body = self.files[self.path.lstrip('/')]
+        etag = '"' + hashlib.md5(body).hexdigest() + '"'
+        range_header = self.headers.get('Range')
+        self.requests.append((self.path, range_header, self.headers.get('If-Range')))
+
+        if range_header and self.headers.get('If-Range') in (None, etag):
+            start = int(range_header.split('=')[1].rstrip('-'))
+            if start >= len(body):
+                self.send_response(416)
+                self.send_header('Content-Range', f'bytes */{len(body)}')
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header('Content-Range', f'bytes {start}-{len(body) - 1}/{len(body)}')
+            body = body[start:]
+        else:
+            self.send_response(200)
+        self.send_header('Content-Type', 'application/pdf')
+        self.send_header('ETag', etag)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def server():
+    StandInHandler.files = {}
+    StandInHandler.requests = []
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), StandInHandler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield httpd
+    httpd.shutdown()
+
+
+def make_downloader(tmp_path, server):
+    template = f"http://127.0.0.1:{server.server_address[1]}/{{name}}"
+    return AttachmentDownloader(str(tmp_path / 'attachments'), template, workers=2, host_interval=0, retries=1)
+
+
+def write_part(downloader, id_, name, content, validator):
+    os.makedirs(downloader.tmp_dir, exist_ok=True)
+    part_path = os.path.join(downloader.tmp_dir, f"{id_}.part")
+    with open(part_path, 'wb') as f:
+        f.write(content)
+    url = downloader.url_template.format(name=name)
+    with open(f"{part_path}.meta", 'w', encoding='utf-8') as f:
+        json.dump({'url': url, 'validator': validator}, f)
+
+
+def read_blob(downloader, entry):
+    with open(downloader.blob_path(entry['sha256'], entry['ext']), 'rb') as f:
+        return f.read()
+
+
+def etag_of(content):
+    return '"' + hashlib.md5(content).hexdigest() + '"'
+
+
+def test_resumes_partial_download_with_range(tmp_path, server):
+    content = b'%PDF-1.4 ' + os.urandom(4096)
+    StandInHandler.files['a'] = content
+    downloader = make_downloader(tmp_path, server)
+    write_part(downloader, '1', 'a', content[:1000], etag_of(content))
+
+    entry = downloader.download_one({'uploadInfoDetailId': '1', 'name': 'a', 'attachFileName': 'a.pdf'})
+
+    assert StandInHandler.requests == [('/a', 'bytes=1000-', etag_of(content))]
+    assert read_blob(downloader, entry) == content
+    assert entry['sha256'] == hashlib.sha256(content).hexdigest()
+    assert os.listdir(downloader.tmp_dir) == []
+
+
+def test_complete_partial_file_is_accepted_on_416(tmp_path, server):
+    content = b'%PDF-1.4 complete'
+    StandInHandler.files['a'] = content
+    downloader = make_downloader(tmp_path, server)
+    write_part(downloader, '1', 'a', content, etag_of(content))
+
+    entry = downloader.download_one({'uploadInfoDetailId': '1', 'name': 'a', 'attachFileName': 'a.pdf'})
+
+    assert StandInHandler.requests[0][1] == f'bytes={len(content)}-'
+    assert read_blob(downloader, entry) == content
+
+
+def test_changed_resource_restarts_instead_of_appending(tmp_path, server):
+    old, new = b'%PDF-1.4 old version', b'%PDF-1.4 new version with more bytes'
+    StandInHandler.files['a'] = new
+    downloader = make_downloader(tmp_path, server)
+    write_part(downloader, '1', 'a', old[:10], etag_of(old))
+
+    entry = downloader.download_one({'uploadInfoDetailId': '1', 'name': 'a', 'attachFileName': 'a.pdf'})
+
+    assert read_blob(downloader, entry) == new
+
+
+def test_identical_content_is_stored_once(tmp_path, server):
+    content = b'%PDF-1.4 shared'
+    StandInHandler.files['a'] = content
+    StandInHandler.files['b'] = content
+    downloader = make_downloader(tmp_path, server)
+
+    downloaded, failed = downloader.download([
+        {'uploadInfoDetailId': '1', 'name': 'a', 'attachFileName': 'a.pdf'},
+        {'uploadInfoDetailId': '2', 'name': 'b', 'attachFileName': 'b.pdf'},
+    ])
+
+    assert failed == [] and len(downloaded) == 2
+    blobs = [name for _, _, names in os.walk(downloader.blob_dir) for name in names]
+    assert blobs == [hashlib.sha256(content).hexdigest() + '.pdf']
+    assert set(make_downloader(tmp_path, server).manifest) == {'1', '2'}
+
+
+def test_reuploaded_attachment_is_downloaded_again(tmp_path, server):
+    StandInHandler.files['a'] = b'%PDF-1.4 first'
+    downloader = make_downloader(tmp_path, server)
+    downloader.download([{'uploadInfoDetailId': '1', 'name': 'a', 'attachFileName': 'a.pdf'}])
+
+    assert downloader.pending_records([{'uploadInfoDetailId': '1', 'attachFileName': 'a.pdf'}]) == []
+    StandInHandler.files['a'] = b'%PDF-1.4 corrected'
+    downloaded, _ = downloader.download([{'uploadInfoDetailId': '1', 'name': 'a', 'attachFileName': 'a_v2.pdf'}])
+
+    assert read_blob(downloader, downloaded[0]) == b'%PDF-1.4 corrected'
+    assert make_downloader(tmp_path, server).manifest['1']['attachFileName'] == 'a_v2.pdf'
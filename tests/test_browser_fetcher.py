@@ -0,0 +1,77 @@
+import json
+import urllib.parse
+
+import pytest
+
+pytest.importorskip('selenium')
+
+import browser_fetcher
+from browser_fetcher import CSRCBrowserFetcher
+from resilience import LatencyTracker, PolicyState
+
+WAF_PAGE = '<html><head><title>访问验证</title></head><body>请稍后再试</body></html>'
+
+
+def display_start(url):
+    ao_data = json.loads(urllib.parse.parse_qs(urllib.parse.urlsplit(url).query)['aoData'][0])
+    return next(item['value'] for item in ao_data if item['name'] == 'iDisplayStart')
+
+
+def make_fetcher(monkeypatch, pages):
+    """pages 为 {display_start: 原始响应}，替换页面内的批量 XHR"""
+    fetcher = CSRCBrowserFetcher.__new__(CSRCBrowserFetcher)
+    monkeypatch.setattr(fetcher, '_execute_batch',
+                        lambda urls, concurrency: [pages[display_start(url)] for url in urls])
+    return fetcher
+
+
+def page(start, total=250, size=100):
+    return {'iTotalRecords': total,
+            'aaData': [{'uploadInfoDetailId': str(i)} for i in range(start, min(start + size, total))]}
+
+
+def test_fetch_all_pages_collects_every_page(monkeypatch):
+    fetcher = make_fetcher(monkeypatch, {0: page(0), 100: page(100), 200: page(200)})
+    assert len(fetcher.fetch_all_pages({}, page_size=100)) == 250
+
+
+def test_html_page_in_batch_fails_the_whole_fetch(monkeypatch):
+    fetcher = make_fetcher(monkeypatch, {0: page(0), 100: WAF_PAGE, 200: page(200)})
+    assert fetcher.fetch_batch([{'display_start': 100, 'display_length': 100}]) == [None]
+    assert fetcher.fetch_all_pages({}, page_size=100) is None
+
+
+def test_html_first_page_fails_the_whole_fetch(monkeypatch):
+    fetcher = make_fetcher(monkeypatch, {0: WAF_PAGE})
+    assert fetcher.fetch_all_pages({}, page_size=100) is None
+
+
+class FakeDriver:
+    def __init__(self):
+        self.scripts = []
+
+    def set_script_timeout(self, seconds):
+        pass
+
+    def execute_async_script(self, script, *args):
+        self.scripts.append(script)
+        return {'iTotalRecords': 0, 'aaData': []}
+
+    def quit(self):
+        pass
+
+
+def test_fetch_fund_data_uses_the_spec_date_range(monkeypatch):
+    monkeypatch.setattr(browser_fetcher, 'get_latency_tracker',
+                        lambda name: LatencyTracker(60, 10, 120, store=PolicyState(), key=name))
+    monkeypatch.setattr(browser_fetcher.rate_limiter, 'acquire', lambda count=1: None)
+    driver = FakeDriver()
+    fetcher = CSRCBrowserFetcher.__new__(CSRCBrowserFetcher)
+    fetcher.driver = driver
+    monkeypatch.setattr(fetcher, 'open_session', lambda: None)
+
+    assert fetcher.fetch_fund_data({'startUploadDate': '2024-03-01', 'endUploadDate': '2024-03-31'}) == []
+    url = driver.scripts[0].split("xhr.open('GET', '")[1].split("'")[0]
+    ao_data = {item['name']: item['value'] for item in
+               json.loads(urllib.parse.parse_qs(urllib.parse.urlsplit(url).query)['aoData'][0])}
+    assert (ao_data['startUploadDate'], ao_data['endUploadDate']) == ('2024-03-01', '2024-03-31')
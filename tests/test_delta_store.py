@@ -0,0 +1,69 @@
+import os
+
+import fund_store
+from delta_store import compact_deltas, delta_files, load_state, snapshot_files, store_dirs, write_delta
+from fund_record import FundRecord
+from fund_store import write_records
+
+
+def record(id_, name):
+    return FundRecord(uploadInfoDetailId=id_, fundCode=f'{int(id_):06d}', fundShortName=name)
+
+
+def paths(tmp_path):
+    return str(tmp_path / 'base.csv'), str(tmp_path / 'deltas'), str(tmp_path / 'snapshots')
+
+
+def names(state):
+    return {id_: item['fundShortName'] for id_, item in state.items()}
+
+
+def test_later_deltas_override_base(tmp_path):
+    base, deltas, snapshots = paths(tmp_path)
+    write_records(base, {'1': record('1', 'base'), '2': record('2', 'base')})
+    write_delta([record('2', 'day1'), record('3', 'day1')], '2024-12-30', deltas)
+    write_delta([record('3', 'day2')], '2025-01-02', deltas)
+    write_delta([record('4', 'day2 again')], '2025-01-02', deltas)
+
+    assert os.path.exists(os.path.join(deltas, '2025', '01', '2025-01-02.csv'))
+    assert names(load_state(base, deltas, snapshots)) == {'1': 'base', '2': 'day1', '3': 'day2', '4': 'day2 again'}
+
+
+def test_compaction_preserves_state(tmp_path):
+    base, deltas, snapshots = paths(tmp_path)
+    write_records(base, {'1': record('1', 'base')})
+    write_delta([record('1', '2024')], '2024-06-01', deltas)
+    write_delta([record('2', '2024')], '2024-12-31', deltas)
+    write_delta([record('2', '2025')], '2025-01-01', deltas)
+    before = names(load_state(base, deltas, snapshots))
+
+    assert compact_deltas(include_current_year=True, deltas_dir=deltas, snapshots_dir=snapshots) == ['2024', '2025']
+    assert delta_files(deltas) == []
+    assert [year for year, _ in snapshot_files(snapshots)] == ['2024', '2025']
+    assert names(load_state(base, deltas, snapshots)) == before == {'1': '2024', '2': '2025'}
+
+
+def test_snapshot_is_read_before_same_year_deltas(tmp_path):
+    base, deltas, snapshots = paths(tmp_path)
+    write_delta([record('1', 'compacted')], '2025-01-01', deltas)
+    compact_deltas(include_current_year=True, deltas_dir=deltas, snapshots_dir=snapshots)
+    write_delta([record('1', 'after compaction')], '2025-02-01', deltas)
+
+    assert names(load_state(base, deltas, snapshots)) == {'1': 'after compaction'}
+
+
+def test_store_file_uses_its_own_deltas(tmp_path, monkeypatch):
+    monkeypatch.setattr(fund_store, 'EXPORT_MODE', 'delta')
+    monkeypatch.chdir(tmp_path)
+    # 默认数据文件的增量（data/deltas）
+    write_delta([record('1', 'main store')], '2025-01-01')
+
+    other = str(tmp_path / 'other' / 'funds.csv')
+    os.makedirs(os.path.dirname(other))
+    new, _, _ = fund_store.commit_batch({'2': record('2', 'other store')}, other, '2025-01-02 00:00:00')
+
+    assert [item['uploadInfoDetailId'] for item in new] == ['2']
+    assert names(fund_store.load_store_records(other)) == {'2': 'other store'}
+    assert store_dirs(other)[0] == str(tmp_path / 'other' / 'funds.deltas')
+    assert [day for day, _ in delta_files(store_dirs(other)[0])] == ['2025-01-02']
+    assert names(fund_store.load_store_records('data/csrc_fund_data.csv')) == {'1': 'main store'}
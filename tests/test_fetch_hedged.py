@@ -0,0 +1,85 @@
+import sys
+import threading
+import time
+import types
+
+import pytest
+
+import fetch_csrc_data
+import resilience
+from resilience import PolicyState, ResiliencePolicy
+
+VALID = {'iTotalRecords': 1, 'aaData': [{'uploadInfoDetailId': '1'}]}
+
+
+@pytest.fixture
+def policies(monkeypatch):
+    """独立的策略和状态，不读写共享的状态文件"""
+    policies = {'urllib': ResiliencePolicy('urllib', 60, 10, 60, retries=3, deadline=90, store=PolicyState()),
+                'browser': ResiliencePolicy('browser', 60, 10, 60, retries=1, deadline=60, store=PolicyState())}
+    monkeypatch.setattr(fetch_csrc_data, 'get_policy', policies.get)
+    monkeypatch.setattr(fetch_csrc_data, 'BROWSER_AVAILABLE', True)
+    monkeypatch.setattr(fetch_csrc_data.rate_limiter, 'acquire', lambda count=1: None)
+    return policies
+
+
+def install_browser(monkeypatch, fetch):
+    class FakeBrowserFetcher:
+        def __init__(self):
+            self.cancelled = False
+            self.cancel_event = threading.Event()
+
+        def fetch_fund_data(self, spec=None):
+            return fetch(self)
+
+        def cancel(self):
+            self.cancelled = True
+            self.cancel_event.set()
+
+    module = types.ModuleType('browser_fetcher')
+    module.CSRCBrowserFetcher = FakeBrowserFetcher
+    monkeypatch.setitem(sys.modules, 'browser_fetcher', module)
+
+
+def join_hedge_threads():
+    for thread in threading.enumerate():
+        if thread.name.startswith('hedge-'):
+            thread.join(timeout=5)
+
+
+def test_urllib_win_does_not_touch_browser_breaker(monkeypatch, policies):
+    def slow_browser(fetcher):
+        # 浏览器被取消时 WebDriver 调用失败，fetch_fund_data 返回 None
+        fetcher.cancel_event.wait(5)
+        return None
+
+    def urllib_fetch(spec=None, cancel=None):
+        time.sleep(0.2)
+        return VALID
+
+    install_browser(monkeypatch, slow_browser)
+    monkeypatch.setattr(fetch_csrc_data, 'fetch_csrc_data', urllib_fetch)
+    policies['browser'].breaker.record_failure()
+
+    assert fetch_csrc_data.fetch_hedged(hedge_delay=0.05) == VALID
+    join_hedge_threads()
+    assert policies['browser'].breaker.failures == 1
+    assert policies['browser'].latency.store.get('latency', 'browser', []) == []
+
+
+def test_browser_win_stops_urllib_retries(monkeypatch, policies):
+    attempts = []
+
+    def failing_urlopen(req, timeout=None):
+        attempts.append(1)
+        raise ConnectionResetError('connection reset')
+
+    install_browser(monkeypatch, lambda fetcher: VALID['aaData'])
+    monkeypatch.setattr(fetch_csrc_data.urllib.request, 'urlopen', failing_urlopen)
+    # 固定使用最长的退避时间，浏览器一定在 urllib 第二次尝试之前返回
+    monkeypatch.setattr(resilience.random, 'uniform', lambda low, high: high)
+
+    assert fetch_csrc_data.fetch_hedged(hedge_delay=0.05) == VALID['aaData']
+    join_hedge_threads()
+    assert attempts == [1]
+    assert policies['urllib'].breaker.failures == 0
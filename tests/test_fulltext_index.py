@@ -0,0 +1,47 @@
+import pytest
+
+from fulltext_index import FulltextIndex, tokenize
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = FulltextIndex(str(tmp_path / 'index'))
+    index.add_documents([
+        ('1', 'sha1', '本基金投资于日本股票市场，属于QDII基金'),
+        ('2', 'sha2', '本基金投资于美国债券，纳斯达克指数'),
+    ])
+    index.add_documents([
+        ('3', 'sha3', '日本债券与东京证券交易所上市的股票'),
+    ])
+    return index
+
+
+def test_tokenize_uses_cjk_bigrams_and_lowercase_words():
+    terms = [term for term, _ in tokenize('日本股票 QDII')]
+    assert terms == ['日本', '本股', '股票', 'qdii']
+
+
+def test_boolean_operators_and_precedence(index):
+    assert index.search('日本 AND 股票') == ['1', '3']
+    assert index.search('日本 NOT 债券') == ['1']
+    assert index.search('纳斯达克 OR (东京 NOT 美国)') == ['2', '3']
+    assert index.search('qdii') == ['1']
+
+
+def test_quoted_phrase_requires_adjacent_terms(index):
+    assert index.search('"日本股票"') == ['1']
+    assert index.search('"日本债券"') == ['3']
+
+
+def test_merge_segments_keeps_results(index):
+    index.add_documents([('1', 'sha1-v2', '本基金投资于美国股票')])
+    index.merge_segments()
+    reopened = FulltextIndex(index.index_dir)
+    assert len(reopened.meta['segments']) == 1
+    assert reopened.search('日本') == ['3']
+    assert reopened.search('美国 AND 股票') == ['1']
+
+
+def test_unbalanced_parentheses_raise(index):
+    with pytest.raises(ValueError):
+        index.search('(日本 AND 股票')
@@ -0,0 +1,68 @@
+import csv
+import os
+
+from fund_record import FundRecord
+from fund_store import change_log_path, commit_batch, diff_records, read_records, record_fingerprint, write_records
+
+
+def test_fingerprint_ignores_fetched_at_and_empty_fields():
+    record = {'uploadInfoDetailId': '1', 'fundCode': '000001', 'reportName': '招募说明书'}
+    same = dict(record, fetched_at='2025-01-01 00:00:00', reportDesp='')
+    assert record_fingerprint(record) == record_fingerprint(same)
+    assert record_fingerprint(record) != record_fingerprint(dict(record, reportName='招募说明书（更正）'))
+
+
+def test_diff_records_splits_new_and_changed():
+    stored = {'1': record_fingerprint({'uploadInfoDetailId': '1', 'fundCode': 'a'}),
+              '2': record_fingerprint({'uploadInfoDetailId': '2', 'fundCode': 'b'})}
+    incoming = {'1': {'uploadInfoDetailId': '1', 'fundCode': 'a'},
+                '2': {'uploadInfoDetailId': '2', 'fundCode': 'changed'},
+                '3': {'uploadInfoDetailId': '3', 'fundCode': 'c'}}
+    new_ids, changed_ids, fingerprints = diff_records(incoming, stored)
+    assert new_ids == {'3'}
+    assert changed_ids == {'2'}
+    assert set(fingerprints) == {'1', '2', '3'}
+
+
+def test_commit_batch_logs_changes_next_to_data_file(tmp_path):
+    filename = str(tmp_path / 'funds.csv')
+    commit_batch({'1': {'uploadInfoDetailId': '1', 'fundCode': 'a', 'reportName': 'old'}}, filename, '2025-01-01 00:00:00')
+    new, changed, changes = commit_batch({'1': {'uploadInfoDetailId': '1', 'fundCode': 'a', 'reportName': 'new'}},
+                                         filename, '2025-01-02 00:00:00')
+
+    assert new == [] and len(changed) == 1
+    assert [(c['field'], c['old_value'], c['new_value']) for c in changes] == [('reportName', 'old', 'new')]
+    assert read_records(filename)['1']['reportName'] == 'new'
+
+    log_path = change_log_path(filename)
+    assert log_path == str(tmp_path / 'funds.changes.csv')
+    with open(log_path, encoding='utf-8') as f:
+        assert [row['new_value'] for row in csv.DictReader(f)] == ['new']
+
+
+def test_default_data_file_keeps_existing_change_log():
+    assert change_log_path('data/csrc_fund_data.csv') == 'data/csrc_fund_changes.csv'
+
+
+def test_rows_added_outside_the_process_are_not_reported_as_new(tmp_path):
+    filename = str(tmp_path / 'funds.csv')
+    commit_batch({'1': {'uploadInfoDetailId': '1', 'fundCode': 'a'}}, filename, '2025-01-01 00:00:00')
+
+    # 其他地方提交的数据（例如 git pull）直接改写了数据文件，指纹索引没有更新
+    records = read_records(filename)
+    records['2'] = FundRecord(uploadInfoDetailId='2', fundCode='b')
+    write_records(filename, records)
+
+    new, changed, _ = commit_batch({'2': {'uploadInfoDetailId': '2', 'fundCode': 'b'}}, filename, '2025-01-02 00:00:00')
+    assert new == [] and changed == []
+
+
+def test_deleted_data_file_is_recreated(tmp_path):
+    filename = str(tmp_path / 'funds.csv')
+    batch = {'1': {'uploadInfoDetailId': '1', 'fundCode': 'a'}}
+    commit_batch(batch, filename, '2025-01-01 00:00:00')
+    os.remove(filename)
+
+    new, _, _ = commit_batch(batch, filename, '2025-01-02 00:00:00')
+    assert [record['uploadInfoDetailId'] for record in new] == ['1']
+    assert set(read_records(filename)) == {'1'}
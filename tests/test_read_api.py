@@ -0,0 +1,72 @@
+from fund_record import FundRecord
+from fund_store import commit_batch, write_records
+from read_api import FundIndex
+
+
+def make_index(tmp_path, count=12):
+    filename = str(tmp_path / 'funds.csv')
+    records = {}
+    for i in range(1, count + 1):
+        organ = '南方基金管理有限公司' if i % 2 else '华夏基金管理有限公司'
+        records[str(i)] = FundRecord(uploadInfoDetailId=str(i), fundCode=f'02{i:04d}', organName=organ,
+                                     fetched_at=f'2025-01-{i:02d} 00:00:00', commit_seq=str((i + 1) // 2))
+    write_records(filename, records)
+    index = FundIndex(filename, str(tmp_path / 'changes.csv'))
+    index.refresh()
+    return index
+
+
+def test_query_pages_with_cursor(tmp_path):
+    index = make_index(tmp_path)
+    seen = []
+    after = None
+    while True:
+        items, after = index.query(after=after, limit=5)
+        seen.extend(item['uploadInfoDetailId'] for item in items)
+        if after is None:
+            break
+    assert seen == [str(i) for i in range(1, 13)]
+
+
+def test_query_matches_organ_name_prefix(tmp_path):
+    index = make_index(tmp_path)
+    items, _ = index.query(organ_name='南方', limit=50)
+    assert [item['uploadInfoDetailId'] for item in items] == ['1', '3', '5', '7', '9', '11']
+
+
+def test_changes_since_returns_later_commits(tmp_path):
+    index = make_index(tmp_path)
+    records, changes, next_cursor, has_more = index.changes_since('5')
+    assert [record['uploadInfoDetailId'] for record in records] == ['11', '12']
+    assert changes == [] and not has_more
+    assert next_cursor == '6:12'
+    assert index.changes_since(next_cursor)[:2] == ([], [])
+
+
+def test_changes_since_pages_with_cursor(tmp_path):
+    index = make_index(tmp_path)
+    seen = []
+    after = None
+    while True:
+        records, _, after, has_more = index.changes_since(after, limit=5)
+        seen.extend(record['uploadInfoDetailId'] for record in records)
+        if not has_more:
+            break
+    assert seen == [str(i) for i in range(1, 13)]
+
+
+def test_late_commit_with_earlier_timestamp_is_not_skipped(tmp_path):
+    filename = str(tmp_path / 'funds.csv')
+    index = FundIndex(filename)
+    commit_batch({'1': {'uploadInfoDetailId': '1', 'fundCode': 'a', 'reportName': 'old'}}, filename,
+                 '2025-01-02 00:00:00')
+    index.refresh()
+    _, _, cursor, _ = index.changes_since()
+
+    # 另一个进程更早获取的数据在之后才提交
+    commit_batch({'1': {'uploadInfoDetailId': '1', 'fundCode': 'a', 'reportName': 'new'},
+                  '2': {'uploadInfoDetailId': '2', 'fundCode': 'b'}}, filename, '2025-01-01 00:00:00')
+    index.refresh()
+    records, changes, _, _ = index.changes_since(cursor)
+    assert sorted(record['uploadInfoDetailId'] for record in records) == ['1', '2']
+    assert [(change['field'], change['new_value']) for change in changes] == [('reportName', 'new')]
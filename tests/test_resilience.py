@@ -0,0 +1,122 @@
+import socket
+import ssl
+import threading
+import time
+import urllib.error
+
+import pytest
+
+import resilience
+from resilience import (CircuitBreaker, CircuitOpenError, FetchCancelled, LatencyTracker, PolicyState,
+                        ResiliencePolicy)
+
+
+@pytest.fixture(autouse=True)
+def no_sleep(monkeypatch):
+    slept = []
+    monkeypatch.setattr(resilience.time, 'sleep', slept.append)
+    return slept
+
+
+def test_latency_samples_survive_a_new_process(tmp_path):
+    path = str(tmp_path / 'state.json')
+    tracker = LatencyTracker(60, 5, 120, store=PolicyState(path), key='urllib')
+    for seconds in (1, 2, 3, 4, 5):
+        tracker.record(seconds)
+
+    # 新的 PolicyState 相当于下一次运行的命令行
+    reloaded = LatencyTracker(60, 5, 120, store=PolicyState(path), key='urllib')
+    assert reloaded.timeout() == 10
+
+
+def test_breaker_opens_across_runs(tmp_path):
+    path = str(tmp_path / 'state.json')
+    for _ in range(3):
+        CircuitBreaker(failure_threshold=3, cooldown=600, store=PolicyState(path), key='browser').record_failure()
+
+    breaker = CircuitBreaker(failure_threshold=3, cooldown=600, store=PolicyState(path), key='browser')
+    assert breaker.state == 'open'
+    breaker.record_success()
+    assert breaker.state == 'closed'
+
+
+def test_open_breaker_skips_call(tmp_path):
+    policy = ResiliencePolicy('browser', 60, 10, 60, retries=1, deadline=60, store=PolicyState())
+    policy.breaker.failure_threshold = 1
+    with pytest.raises(RuntimeError):
+        policy.call(lambda: (_ for _ in ()).throw(RuntimeError('boom')))
+    with pytest.raises(CircuitOpenError):
+        policy.call(lambda: 'never called')
+
+
+def test_retries_stop_at_the_deadline(monkeypatch):
+    clock = [0.0]
+    monkeypatch.setattr(resilience.time, 'monotonic', lambda: clock[0])
+    policy = ResiliencePolicy('urllib', 60, 10, 60, retries=3, deadline=90, store=PolicyState())
+    timeouts = []
+
+    def slow_request():
+        timeout = policy.timeout()
+        timeouts.append(timeout)
+        clock[0] += timeout
+        raise socket.timeout('timed out')
+
+    with pytest.raises(socket.timeout):
+        policy.call(slow_request)
+    assert clock[0] <= 90 + 1
+    assert timeouts[0] == 60 and len(timeouts) == 2
+
+
+def test_non_retryable_errors_fail_immediately():
+    policy = ResiliencePolicy('urllib', 60, 10, 60, retries=3, deadline=90, store=PolicyState())
+    calls = []
+
+    def bad_request():
+        calls.append(1)
+        raise ValueError('bad response')
+
+    with pytest.raises(ValueError):
+        policy.call(bad_request)
+    assert len(calls) == 1
+
+    def untrusted_certificate():
+        calls.append(1)
+        raise urllib.error.URLError(ssl.SSLCertVerificationError('certificate verify failed'))
+
+    with pytest.raises(urllib.error.URLError):
+        policy.call(untrusted_certificate)
+    assert len(calls) == 2
+
+    assert not resilience.is_retryable(urllib.error.URLError(socket.gaierror(-2, 'Name or service not known')))
+    assert not resilience.is_retryable(PermissionError(13, 'Permission denied'))
+    assert resilience.is_retryable(urllib.error.URLError(ConnectionRefusedError(111, 'Connection refused')))
+    assert resilience.is_retryable(urllib.error.URLError(socket.timeout('timed out')))
+
+
+def test_cancelled_call_is_neither_success_nor_failure():
+    policy = ResiliencePolicy('browser', 60, 10, 60, retries=1, deadline=60, store=PolicyState())
+    policy.breaker.record_failure()
+
+    def cancelled_fetch():
+        raise FetchCancelled('cancelled')
+
+    with pytest.raises(FetchCancelled):
+        policy.call(cancelled_fetch)
+    assert policy.breaker.failures == 1
+    assert policy.latency.store.get('latency', 'browser', []) == []
+
+
+def test_cancel_stops_retries():
+    policy = ResiliencePolicy('urllib', 60, 10, 60, retries=3, deadline=90, store=PolicyState())
+    cancel = threading.Event()
+    calls = []
+
+    def failing_request():
+        calls.append(1)
+        cancel.set()
+        raise ConnectionResetError('connection reset')
+
+    with pytest.raises(FetchCancelled):
+        policy.call(failing_request, cancel)
+    assert len(calls) == 1
+    assert policy.breaker.failures == 0
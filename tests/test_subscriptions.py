@@ -0,0 +1,42 @@
+import random
+
+from subscriptions import AhoCorasick, SubscriptionMatcher
+
+
+def test_aho_corasick_matches_naive_search():
+    rng = random.Random(0)
+    for _ in range(200):
+        patterns = [''.join(rng.choice('abc') for _ in range(rng.randint(1, 4))) for _ in range(rng.randint(1, 6))]
+        text = ''.join(rng.choice('abc') for _ in range(rng.randint(0, 30)))
+        expected = {index for index, pattern in enumerate(patterns) if pattern in text}
+        assert AhoCorasick(patterns).search(text) == expected
+
+
+def test_aho_corasick_is_case_insensitive():
+    assert AhoCorasick(['qdii', '日本']).search('南方日本QDII基金') == {0, 1}
+
+
+def test_company_prefix_matches_full_organ_name():
+    matcher = SubscriptionMatcher([
+        {'email': 'short@example.com', 'companies': ['南方']},
+        {'email': 'full@example.com', 'companies': ['南方基金管理有限公司']},
+        {'email': 'other@example.com', 'companies': ['华夏']},
+    ])
+    record = {'organName': '南方基金管理有限公司', 'fundCode': '020907'}
+    assert set(matcher.match_batch([record])) == {'short@example.com', 'full@example.com'}
+
+
+def test_rule_kinds_are_combined_with_and():
+    matcher = SubscriptionMatcher([
+        {'email': 'a@example.com', 'keywords': ['日本'], 'companies': ['南方']},
+        {'email': 'b@example.com', 'fund_code_prefixes': ['0209']},
+        {'email': 'c@example.com'},
+    ])
+    records = [
+        {'fundShortName': '南方日本精选', 'organName': '南方基金管理有限公司', 'fundCode': '020907'},
+        {'fundShortName': '华夏日本精选', 'organName': '华夏基金管理有限公司', 'fundCode': '000001'},
+    ]
+    digests = matcher.match_batch(records)
+    assert digests['a@example.com'] == [records[0]]
+    assert digests['b@example.com'] == [records[0]]
+    assert digests['c@example.com'] == records
@@ -0,0 +1,94 @@
+import multiprocessing
+import os
+
+import pytest
+
+import fetch_csrc_data
+from work_queue import MAX_TASK_ATTEMPTS, WorkQueue, shard_specs
+
+
+def test_shard_specs_splits_date_range_and_keeps_other_fields():
+    shards = shard_specs([{'fundCompanyShortName': '南方', 'startUploadDate': '2025-01-01',
+                           'endUploadDate': '2025-01-10'}], shard_days=4)
+    assert [(s['startUploadDate'], s['endUploadDate']) for s in shards] == [
+        ('2025-01-01', '2025-01-04'), ('2025-01-05', '2025-01-08'), ('2025-01-09', '2025-01-10')]
+    assert all(s['fundCompanyShortName'] == '南方' for s in shards)
+
+    unsplit = shard_specs([{'startUploadDate': '2025-01-01', 'endUploadDate': '2025-01-10'}], shard_days=0)
+    assert [(s['startUploadDate'], s['endUploadDate']) for s in unsplit] == [('2025-01-01', '2025-01-10')]
+
+
+def test_claim_complete_and_fail(tmp_path):
+    work_queue = WorkQueue(str(tmp_path / 'queue.sqlite3'))
+    work_queue.add_tasks([{'n': 1}, {'n': 2}])
+
+    first = work_queue.claim('a')
+    second = work_queue.claim('b')
+    assert first[1] == {'n': 1} and second[1] == {'n': 2}
+    assert work_queue.claim('c') is None
+
+    work_queue.complete(first[0], [{'uploadInfoDetailId': '1'}], 1.5)
+    assert work_queue.take_batches() == [[{'uploadInfoDetailId': '1'}]]
+    assert work_queue.take_batches() == []
+
+    # 未达到次数上限时重新排队，达到上限后标记为失败
+    for attempt in range(1, MAX_TASK_ATTEMPTS + 1):
+        if attempt > 1:
+            assert work_queue.claim('b')[0] == second[0]
+        work_queue.fail(second[0], 0.5)
+    assert work_queue.counts() == {'done': 1, 'failed': 1}
+    assert work_queue.worker_stats()['a'] == {'done': 1, 'failed': 0, 'records': 1, 'seconds': 1.5}
+    work_queue.close()
+
+
+def test_requeue_worker_gives_up_after_max_attempts(tmp_path):
+    work_queue = WorkQueue(str(tmp_path / 'queue.sqlite3'))
+    work_queue.add_tasks([{'n': 1}])
+
+    for attempt in range(1, MAX_TASK_ATTEMPTS + 1):
+        assert work_queue.claim(f"worker-{attempt}") is not None
+        requeued = work_queue.requeue_worker(f"worker-{attempt}")
+        assert requeued == (1 if attempt < MAX_TASK_ATTEMPTS else 0)
+    assert work_queue.counts() == {'failed': 1}
+    work_queue.close()
+
+
+@pytest.mark.skipif(multiprocessing.get_start_method() != 'fork', reason='需要 fork 启动方式继承替换的获取函数')
+def test_coordinator_replaces_crashed_workers(tmp_path, monkeypatch):
+    def fake_fetch_all_pages(spec):
+        # 每个分片第一次被领取时让工作进程直接退出，模拟进程崩溃
+        marker = tmp_path / spec['startUploadDate']
+        if not marker.exists():
+            marker.touch()
+            os._exit(3)
+        return [{'uploadInfoDetailId': spec['startUploadDate'], 'fundCode': '000001'}]
+
+    saved = []
+    monkeypatch.delenv('USE_BROWSER_FETCHER', raising=False)
+    monkeypatch.setattr(fetch_csrc_data, 'fetch_all_pages', fake_fetch_all_pages)
+    monkeypatch.setattr(fetch_csrc_data, 'save_fund_data_to_csv', lambda fund_data: saved.extend(fund_data) or True)
+    monkeypatch.setattr(fetch_csrc_data, 'process_attachments', lambda fund_data: None)
+
+    specs = [{'startUploadDate': '2025-01-01', 'endUploadDate': '2025-01-04'}]
+    assert fetch_csrc_data.run_coordinator(specs, workers=2, shard_days=1)
+    assert sorted(record['uploadInfoDetailId'] for record in saved) == [
+        '2025-01-01', '2025-01-02', '2025-01-03', '2025-01-04']
+
+
+def test_urllib_fetch_all_pages_follows_total_and_fails_on_missing_page(monkeypatch):
+    rows = [{'uploadInfoDetailId': str(i)} for i in range(25)]
+    requested = []
+
+    def fake_fetch(spec, display_start, display_length):
+        requested.append(display_start)
+        return {'iTotalRecords': len(rows), 'aaData': rows[display_start:display_start + display_length]}
+
+    monkeypatch.setattr(fetch_csrc_data, 'fetch_csrc_data', fake_fetch)
+    fund_data = fetch_csrc_data.fetch_all_pages({}, page_size=10)
+    assert requested == [0, 10, 20]
+    assert [record['uploadInfoDetailId'] for record in fund_data] == [row['uploadInfoDetailId'] for row in rows]
+
+    monkeypatch.setattr(fetch_csrc_data, 'fetch_csrc_data',
+                        lambda spec, display_start, display_length: None if display_start else fake_fetch(
+                            spec, display_start, display_length))
+    assert fetch_csrc_data.fetch_all_pages({}, page_size=10) is None
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+协调者/工作进程模式使用的本地任务队列（SQLite，无需外部消息服务）
+协调者把查询条件按上传日期切分为分片写入任务表，各工作进程领取分片、获取数据后把结果批次写回队列，
+协调者读取批次后统一去重、保存和发送通知
+"""
+
+import json
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from csrc_query import DEFAULT_LOOKBACK_DAYS
+
+
+# 分片获取失败后重新排队的次数上限（获取函数内部已有重试）
+MAX_TASK_ATTEMPTS = 2
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY,
+    spec TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    worker TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    records INTEGER NOT NULL DEFAULT 0,
+    seconds REAL NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS batches (
+    id INTEGER PRIMARY KEY,
+    task_id INTEGER NOT NULL,
+    payload TEXT NOT NULL
+);
+"""
+
+
+def _parse_date(value):
+    return value if isinstance(value, datetime) else datetime.strptime(value, '%Y-%m-%d')
+
+
+def shard_specs(specs, shard_days=None):
+    """
+    把查询条件按上传日期切分为分片
+    每个查询条件的日期范围为 startUploadDate ~ endUploadDate（默认最近30天），
+    shard_days 为每个分片的天数，为空或 0 时不切分
+    :return: 分片查询条件列表，每项带有 startUploadDate/endUploadDate
+    """
+    now = datetime.now()
+    shards = []
+    for spec in specs:
+        spec = dict(spec or {})
+        start = _parse_date(spec.get('startUploadDate') or now - timedelta(days=DEFAULT_LOOKBACK_DAYS))
+        end = _parse_date(spec.get('endUploadDate') or now)
+        step = timedelta(days=shard_days) if shard_days and shard_days > 0 else end - start + timedelta(days=1)
+
+        shard_start = start
+        while shard_start.date() <= end.date():
+            shard_end = min(end, shard_start + step - timedelta(days=1))
+            shards.append(dict(spec, startUploadDate=shard_start.strftime('%Y-%m-%d'),
+                               endUploadDate=shard_end.strftime('%Y-%m-%d')))
+            shard_start += step
+    return shards
+
+
+class WorkQueue:
+    """基于 SQLite 的任务队列，协调者和各工作进程分别打开同一个数据库文件"""
+
+    def __init__(self, path, timeout=30):
+        self.path = path
+        self.conn = sqlite3.connect(path, timeout=timeout, isolation_level=None)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _transaction(self):
+        """写事务：BEGIN IMMEDIATE 立即取得写锁，保证领取任务时不会被两个进程同时领取"""
+        self.conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield self.conn
+        except BaseException:
+            self.conn.execute('ROLLBACK')
+            raise
+        self.conn.execute('COMMIT')
+
+    def add_tasks(self, specs):
+        with self._transaction() as conn:
+            conn.executemany('INSERT INTO tasks (spec) VALUES (?)',
+                             [(json.dumps(spec, ensure_ascii=False),) for spec in specs])
+
+    def claim(self, worker):
+        """领取一个待处理的分片，没有剩余分片时返回 None"""
+        with self._transaction() as conn:
+            row = conn.execute("SELECT id, spec FROM tasks WHERE status = 'pending' ORDER BY id LIMIT 1").fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE tasks SET status = 'running', worker = ?, attempts = attempts + 1 WHERE id = ?",
+                         (worker, row[0]))
+        return row[0], json.loads(row[1])
+
+    def complete(self, task_id, records, seconds):
+        """提交分片的获取结果"""
+        payload = json.dumps([record.to_dict() if hasattr(record, 'to_dict') else record for record in records],
+                             ensure_ascii=False)
+        with self._transaction() as conn:
+            conn.execute('INSERT INTO batches (task_id, payload) VALUES (?, ?)', (task_id, payload))
+            conn.execute("UPDATE tasks SET status = 'done', records = ?, seconds = seconds + ? WHERE id = ?",
+                         (len(records), seconds, task_id))
+
+    def fail(self, task_id, seconds):
+        """分片获取失败，未达到次数上限时重新排队"""
+        with self._transaction() as conn:
+            conn.execute("UPDATE tasks SET status = CASE WHEN attempts < ? THEN 'pending' ELSE 'failed' END, "
+                         "seconds = seconds + ? WHERE id = ?", (MAX_TASK_ATTEMPTS, seconds, task_id))
+
+    def requeue_worker(self, worker):
+        """
+        工作进程异常退出时，把它正在处理的分片重新排队
+        领取次数已达到上限的分片标记为失败，避免每次都导致进程退出的分片被无限重试
+        :return: 重新排队的分片数
+        """
+        with self._transaction() as conn:
+            conn.execute("UPDATE tasks SET status = 'failed' WHERE worker = ? AND status = 'running' AND attempts >= ?",
+                         (worker, MAX_TASK_ATTEMPTS))
+            return conn.execute("UPDATE tasks SET status = 'pending' WHERE worker = ? AND status = 'running'",
+                                (worker,)).rowcount
+
+    def take_batches(self):
+        """取出并删除已提交的结果批次，返回记录字典列表的列表"""
+        with self._transaction() as conn:
+            rows = conn.execute('SELECT id, payload FROM batches ORDER BY id').fetchall()
+            if rows:
+                conn.execute('DELETE FROM batches WHERE id <= ?', (rows[-1][0],))
+        return [json.loads(payload) for _, payload in rows]
+
+    def counts(self):
+        """各状态的分片数量"""
+        return dict(self.conn.execute('SELECT status, COUNT(*) FROM tasks GROUP BY status').fetchall())
+
+    def worker_stats(self):
+        """
+        每个工作进程的统计：{worker: {'done': 分片数, 'failed': 分片数, 'records': 记录数, 'seconds': 获取耗时}}
+        失败后被其他进程重新领取的分片计入最后处理它的工作进程
+        """
+        stats = {}
+        rows = self.conn.execute('SELECT worker, status, COUNT(*), SUM(records), SUM(seconds) FROM tasks '
+                                 'WHERE worker IS NOT NULL GROUP BY worker, status ORDER BY worker')
+        for worker, status, count, records, seconds in rows:
+            item = stats.setdefault(worker, {'done': 0, 'failed': 0, 'records': 0, 'seconds': 0.0})
+            if status in ('done', 'failed'):
+                item[status] += count
+            item['records'] += records or 0
+            item['seconds'] += seconds or 0
+        return stats
+
+    def close(self):
+        self.conn.close()